@@ -1,57 +1,147 @@
 # auth.py
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import time
+from datetime import timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError
+from app.models.principal import Principal
 from app.models.user import UserInDB
-from app.db.config import Database
-from bson import ObjectId
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.hashing import get_pwd_context, password_hasher
+from app.core.metrics import stage
+from app.core.tokens import token_engine
+from app.core.user_cache import MISSING, user_cache
+from app.services.user_loader import user_loader
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+token_cache = TTLCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
 
 class AuthHandler:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        with stage("password_verify"):
+            return await password_hasher.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+        """Verify a password; also returns a replacement hash when the stored one predates the hashing policy."""
+        with stage("password_verify"):
+            return await password_hasher.verify_and_update(plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        with stage("password_hash"):
+            return await password_hasher.hash(password)
 
     @staticmethod
     def create_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        if expires_delta is None:
+            expires_delta = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+        to_encode.update({"exp": int(time.time() + expires_delta.total_seconds())})
+        with stage("jwt_encode"):
+            return token_engine.encode(to_encode)
 
     @staticmethod
-    async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
-        credentials_exception = HTTPException(
+    def decode_token(token: str) -> dict:
+        """Decode a bearer token, reusing claims verified by an earlier request."""
+        if not settings.TOKEN_CACHE_ENABLED:
+            with stage("jwt_decode"):
+                return token_engine.decode(token)
+
+        key = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(key)
+        if payload is None:
+            with stage("jwt_decode"):
+                payload = token_engine.decode(token)
+            exp = payload.get("exp")
+            if exp is not None:
+                # Never serve claims past the token's own expiry
+                token_cache.set(key, payload, ttl=exp - time.time())
+        return payload
+
+    @staticmethod
+    def _credentials_exception() -> HTTPException:
+        return HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    @staticmethod
+    def _get_token_subject(token: str) -> str:
         try:
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            payload = AuthHandler.decode_token(token)
             user_id: str = payload.get("sub")
             if user_id is None:
-                raise credentials_exception
+                raise AuthHandler._credentials_exception()
         except JWTError:
-            raise credentials_exception
+            raise AuthHandler._credentials_exception()
+        return user_id
 
-        db = await Database.get_db()
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+    @staticmethod
+    async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+        """Resolve the bearer token to a cached, projected Principal."""
+        user_id = AuthHandler._get_token_subject(token)
+
+        user = await user_cache.get(user_id)
+        if user is MISSING:
+            user = await user_loader.load(user_id, "principal")
+            await user_cache.set(user_id, user)
         
+        if user is None:
+            raise AuthHandler._credentials_exception()
+        return Principal(user)
+
+    @staticmethod
+    async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+        """Resolve the bearer token to the full user profile."""
+        user_id = AuthHandler._get_token_subject(token)
+
+        user = await user_loader.load(user_id, "full")
         
         if user is None:
-            raise credentials_exception
-        user["_id"] = str(user["_id"])
+            raise AuthHandler._credentials_exception()
         return UserInDB(**user)
+
+    @staticmethod
+    def require_introspection_client(x_api_key: Optional[str] = Header(None)) -> None:
+        """Guard for the gateway-facing introspection endpoint; it stays closed until INTROSPECTION_API_KEY is set."""
+        expected = settings.INTROSPECTION_API_KEY
+        if not expected:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Token introspection is disabled"
+            )
+        if not (x_api_key and hmac.compare_digest(x_api_key, expected)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid API key"
+            )
+
+    @staticmethod
+    def require_admin(x_api_key: Optional[str] = Header(None)) -> None:
+        """Guard for admin endpoints; they stay closed until ADMIN_API_KEY is set."""
+        expected = settings.ADMIN_API_KEY
+        if not expected:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Admin API is disabled"
+            )
+        if not (x_api_key and hmac.compare_digest(x_api_key, expected)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid API key"
+            )
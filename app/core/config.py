@@ -6,21 +6,117 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     API_V1_STR: str = "/api/v1"
     
+    # Server (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None  # defaults to the CPUs available to the container
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_SECONDS: int = 5
+    SERVER_MAX_REQUESTS: Optional[int] = None  # recycle a worker after this many requests
+    SERVER_MAX_REQUESTS_JITTER: int = 0  # plus a random 0..jitter, drawn per worker
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30  # wait for in-flight requests on SIGTERM
+    SERVER_ACCESS_LOG: bool = False
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"  # proxies trusted for X-Forwarded-* headers
+    
+    # Startup: FAST_STARTUP skips the startup ping, collection listing and eager client setup
+    FAST_STARTUP: bool = False
+    STARTUP_INDEXES: Optional[str] = None  # "create", "background" or "skip"; defaults to background with FAST_STARTUP
+    
     # JWT Settings
     JWT_SECRET_KEY: str
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
-    JWT_ALGORITHM: str = "HS256"
+    JWT_ALGORITHM: str = "HS256"  # HS256, or RS256/ES256 with JWT_SIGNING_KEYS
+    JWT_SIGNING_KEYS: dict = {}  # kid -> PEM private key or path to one
+    JWT_VERIFICATION_KEYS: dict = {}  # kid -> PEM public key of a retired signing key
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWKS_MAX_AGE_SECONDS: int = 3600
+    JWT_ENGINE: str = "auto"  # "jose", "hs256", or "auto" for hs256 whenever JWT_ALGORITHM is HS256
+    
+    # Verified access token cache
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    
+    # Serialize StandardResponse envelopes once, bypassing response-model validation
+    FAST_RESPONSES: bool = False
+    
+    # Batch token introspection
+    INTROSPECTION_MAX_TOKENS: int = 100
+    INTROSPECTION_MAX_TOKEN_LENGTH: int = 4096
+    INTROSPECTION_API_KEY: Optional[str] = None  # required in X-API-Key; the endpoint is disabled until set
+    
+    # User principal cache
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_NEGATIVE_TTL_SECONDS: int = 10
+    
+    # Login timestamp write-behind (False keeps one synchronous update per login)
+    LOGIN_STAMP_WRITE_BEHIND: bool = True
+    LOGIN_STAMP_BATCH_SIZE: int = 500
+    LOGIN_STAMP_FLUSH_SECONDS: float = 1.0
+    LOGIN_STAMP_MAX_PENDING: int = 100000  # stamps for further users are dropped while this many are queued
+    
+    # Password hashing settings (calibrate with python -m app.core.hashing --target-ms 250)
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt", or "argon2" with argon2-cffi installed
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_REHASH_ON_LOGIN: bool = True  # replace hashes made under an older policy at login
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # defaults to the CPU count
+    PASSWORD_HASH_MAX_BACKLOG: int = 256
+    
+    # Metrics exposed at /metrics
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None  # shared by all workers; empty it before each start
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    
+    # Bulk user import and export
+    BULK_IMPORT_CHUNK_SIZE: int = 1000  # rows hashed and written per bulk_write
+    BULK_IMPORT_HASH_WORKERS: Optional[int] = None  # hashing processes; defaults to the CPU count
+    BULK_IMPORT_MAX_REPORTED_ERRORS: int = 1000  # per-row errors returned by the admin endpoint
+    BULK_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024  # longer lines and CSV records are rejected, not buffered
+    BULK_EXPORT_BATCH_SIZE: int = 1000
+
+    # Admin user listing (keyset pagination)
+    USER_LIST_DEFAULT_LIMIT: int = 50
+    USER_LIST_MAX_LIMIT: int = 200
+    USER_LIST_MAX_COUNT: int = 10000  # filtered totals stop counting here and are reported as estimates
+    # Read preference for the listing only, e.g. "secondaryPreferred"; reads by users
+    # themselves, including /users/me, always use the primary so they see their own writes
+    USER_LIST_READ_PREFERENCE: str = "primary"
     
     # Redis Settings
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
-    REDIS_OM_URL: str = None
+    REDIS_OM_URL: Optional[str] = None
+    REDIS_CACHE_ENABLED: bool = False
+    REDIS_CACHE_NAMESPACE: str = "fastapi-auth"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 0.5
     
     # MongoDB Settings
     MONGODB_URL: str
     DB_NAME: str = "flight_tracker"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None  # None keeps idle connections open
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # None waits for a free connection indefinitely
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    
+    # MongoDB slow operation log and per-shape statistics
+    MONGO_PROFILER_ENABLED: bool = True
+    MONGO_SLOW_OPERATION_MS: float = 100
+    MONGO_PROFILER_MAX_SHAPES: int = 500
+    MONGO_PROFILER_SAMPLES_PER_SHAPE: int = 1024
+    
+    # Admin endpoints are disabled unless this key is set; send it in X-API-Key
+    ADMIN_API_KEY: Optional[str] = None
     
     # google settings
     GOOGLE_CLIENT_ID: str
@@ -35,6 +131,21 @@ class Settings(BaseSettings):
     # apple settings
     BUNDLE_ID_IOS: str
     
+    # Outbound HTTP settings (OAuth providers)
+    OUTBOUND_HTTP_MAX_CONNECTIONS: int = 100
+    OUTBOUND_HTTP_MAX_KEEPALIVE: int = 20
+    OUTBOUND_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    OUTBOUND_HTTP_CONNECT_TIMEOUT: float = 2.0
+    OUTBOUND_HTTP_READ_TIMEOUT: float = 5.0
+    OUTBOUND_HTTP_MAX_RETRIES: int = 2
+    OUTBOUND_HTTP_RETRY_BACKOFF: float = 0.1
+    OUTBOUND_HTTP_BREAKER_THRESHOLD: int = 5
+    OUTBOUND_HTTP_BREAKER_RESET_SECONDS: float = 30.0
+    OUTBOUND_HTTP_PROVIDERS: dict = {
+        "google": {"connect_timeout": 2.0, "read_timeout": 5.0},
+        "apple": {"connect_timeout": 2.0, "read_timeout": 5.0}
+    }
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,34 @@
+# etag.py
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Clients may store the response but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def user_etag(view: str, user_id: str, updated_at: Optional[datetime], last_login: Optional[datetime]) -> str:
+    """Strong ETag for a view of a user, derived from the fields that version the document."""
+    version = f"{view}:{user_id}:{updated_at}:{last_login}"
+    return '"' + hashlib.sha256(version.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
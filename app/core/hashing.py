@@ -0,0 +1,213 @@
+# hashing.py
+"""
+Password hashing policy and the worker pool that runs it.
+
+The policy (scheme and cost) comes from Settings. Hashes made under an older
+policy still verify and are replaced on the user's next login. To choose a
+cost for the target hardware:
+
+    python -m app.core.hashing --target-ms 250
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException, status
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMES = ("bcrypt", "argon2")
+
+
+def policy_options(scheme: str, **overrides) -> dict:
+    """CryptContext keyword arguments for the configured cost of a scheme."""
+    if scheme == "bcrypt":
+        options = {"rounds": settings.PASSWORD_BCRYPT_ROUNDS}
+    elif scheme == "argon2":
+        options = {
+            "time_cost": settings.PASSWORD_ARGON2_TIME_COST,
+            "memory_cost": settings.PASSWORD_ARGON2_MEMORY_COST,
+            "parallelism": settings.PASSWORD_ARGON2_PARALLELISM,
+        }
+    else:
+        raise ValueError(f"Unknown password hash scheme: {scheme}")
+    options.update(overrides)
+    return {f"{scheme}__{name}": value for name, value in options.items()}
+
+
+def build_context(scheme: str, **overrides):
+    from passlib.context import CryptContext
+
+    # Every scheme stays verifiable; anything but the configured one, or a different cost, needs an update
+    context = CryptContext(
+        schemes=[scheme] + [other for other in SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto",
+        **policy_options(scheme, **overrides),
+    )
+    # Fail now rather than on the first registration if the scheme's library is missing
+    context.handler(scheme).get_backend()
+    return context
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """The passlib context for the configured policy, built (and passlib imported) on first use."""
+    return build_context(settings.PASSWORD_HASH_SCHEME)
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str):
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def hash_many(passwords: list) -> list:
+    """Hash a batch in one call; used by bulk imports to amortise process pool round trips."""
+    return [_hash(password) for password in passwords]
+
+
+def _timed(func, *args):
+    """Run func in the worker and report when it actually started."""
+    return time.monotonic(), func(*args)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool so it never blocks the event loop."""
+
+    def __init__(self, executor: str = "thread", workers: Optional[int] = None, max_backlog: int = 256):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.executor_type = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.max_backlog = max_backlog
+        self._executor: Optional[Executor] = None
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash"
+                )
+            logger.info(f"Password hashing pool started ({self.executor_type}, {self.workers} workers)")
+        return self._executor
+
+    async def _submit(self, func, *args):
+        if self.pending >= self.max_backlog:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is temporarily overloaded, please retry"
+            )
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+        self.pending += 1
+        future = loop.run_in_executor(self._get_executor(), _timed, func, *args)
+        try:
+            started_at, result = await future
+        finally:
+            self.pending -= 1
+
+        wait = max(started_at - submitted_at, 0.0)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        """Return (valid, new_hash); new_hash is set when the stored hash predates the current policy."""
+        return await self._submit(_verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_backlog": self.max_backlog,
+            "queue_depth": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait / self.completed * 1000) if self.completed else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_backlog=settings.PASSWORD_HASH_MAX_BACKLOG,
+)
+
+
+def _time_hash(context, samples: int) -> float:
+    context.hash("calibration")  # loads the backend
+    started = time.perf_counter()
+    for _ in range(samples):
+        context.hash("calibration-password")
+    return (time.perf_counter() - started) / samples * 1000
+
+
+def calibrate(scheme: str, target_ms: float, samples: int = 3) -> list:
+    """Time the scheme's cost parameter upwards until it is well past target_ms; returns (cost, ms) pairs."""
+    if scheme == "bcrypt":
+        parameter, costs = "rounds", range(4, 32)
+    else:
+        parameter, costs = "time_cost", range(1, 64)
+
+    results = []
+    for cost in costs:
+        elapsed = _time_hash(build_context(scheme, **{parameter: cost}), samples)
+        results.append((cost, elapsed))
+        print(f"{scheme} {parameter}={cost}: {elapsed:.1f} ms")
+        if elapsed > target_ms * 2:
+            break
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend a password hashing cost for this machine.")
+    parser.add_argument("--target-ms", type=float, default=250, help="hash time budget per login")
+    parser.add_argument("--scheme", choices=SCHEMES, default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--samples", type=int, default=3, help="hashes timed per cost")
+    args = parser.parse_args()
+
+    results = calibrate(args.scheme, args.target_ms, args.samples)
+    within = [(cost, elapsed) for cost, elapsed in results if elapsed <= args.target_ms] or results[:1]
+    cost, elapsed = within[-1]
+    setting = "PASSWORD_BCRYPT_ROUNDS" if args.scheme == "bcrypt" else "PASSWORD_ARGON2_TIME_COST"
+    print(f"\nRecommended: {setting}={cost} ({elapsed:.1f} ms per hash, "
+          f"about {1000 / elapsed:.0f} logins/s per hashing worker)")
+    sys.exit(0 if elapsed <= args.target_ms else 1)
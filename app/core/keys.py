@@ -0,0 +1,111 @@
+# keys.py
+"""
+Keys used to sign and verify the tokens this service issues.
+
+With an HS* algorithm tokens are signed with JWT_SECRET_KEY as before. With RS256
+or ES256 every entry of JWT_SIGNING_KEYS (kid -> PEM private key, or a path to
+one) is published in the JWKS document and JWT_ACTIVE_KID selects the key that
+signs new tokens. Rotating a key:
+
+1. Add the new key to JWT_SIGNING_KEYS and deploy; it is now published.
+2. Once downstream JWKS caches have expired, point JWT_ACTIVE_KID at it.
+3. After the longest token lifetime, move the old key's public half to
+   JWT_VERIFICATION_KEYS, or drop it.
+"""
+from typing import TYPE_CHECKING, Dict, Optional
+
+from jose import JWTError
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from jose.backends.base import Key
+
+SUPPORTED_ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512")
+
+
+def _load_pem(value: str) -> str:
+    if value.lstrip().startswith("-----BEGIN"):
+        return value
+    with open(value) as pem_file:
+        return pem_file.read()
+
+
+class KeyRing:
+    def __init__(
+        self,
+        algorithm: str,
+        secret: Optional[str] = None,
+        signing_keys: Optional[Dict[str, str]] = None,
+        verification_keys: Optional[Dict[str, str]] = None,
+        active_kid: Optional[str] = None,
+    ):
+        self.algorithm = algorithm
+        self.secret = secret
+        self._signing: Dict[str, "Key"] = {}
+        self._verifying: Dict[str, "Key"] = {}
+        self.active_kid = None
+
+        if not self.asymmetric:
+            return
+        if algorithm not in SUPPORTED_ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        if not signing_keys:
+            raise ValueError(f"JWT_SIGNING_KEYS must contain at least one key for {algorithm}")
+
+        from jose import jwk
+
+        for kid, pem in signing_keys.items():
+            key = jwk.construct(_load_pem(pem), algorithm)
+            self._signing[kid] = key
+            self._verifying[kid] = key.public_key()
+        for kid, pem in (verification_keys or {}).items():
+            self._verifying.setdefault(kid, jwk.construct(_load_pem(pem), algorithm))
+
+        self.active_kid = active_kid or next(iter(signing_keys))
+        if self.active_kid not in self._signing:
+            raise ValueError(f"JWT_ACTIVE_KID {self.active_kid} is not in JWT_SIGNING_KEYS")
+
+    @property
+    def asymmetric(self) -> bool:
+        return not self.algorithm.startswith("HS")
+
+    def encode(self, claims: dict) -> str:
+        from jose import jwt
+
+        if not self.asymmetric:
+            return jwt.encode(claims, self.secret, algorithm=self.algorithm)
+        return jwt.encode(
+            claims,
+            self._signing[self.active_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.active_kid}
+        )
+
+    def decode(self, token: str) -> dict:
+        from jose import jwt
+
+        if not self.asymmetric:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        key = self._verifying.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        """Public keys in JWK Set format; empty for shared-secret algorithms."""
+        keys = []
+        for kid, key in self._verifying.items():
+            public = key.to_dict()
+            public.update({"kid": kid, "use": "sig"})
+            keys.append(public)
+        return {"keys": keys}
+
+
+keyring = KeyRing(
+    algorithm=settings.JWT_ALGORITHM,
+    secret=settings.JWT_SECRET_KEY,
+    signing_keys=settings.JWT_SIGNING_KEYS,
+    verification_keys=settings.JWT_VERIFICATION_KEYS,
+    active_kid=settings.JWT_ACTIVE_KID,
+)
@@ -0,0 +1,421 @@
+# metrics.py
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Every metric is recorded on the event loop thread, so plain dict and list
+updates need no locks; callbacks from other threads (the Mongo command
+listener) are handed to the loop with call_soon_threadsafe. With several
+worker processes, set METRICS_MULTIPROC_DIR: each worker periodically writes
+a snapshot there and a scrape of any worker merges them all. Histograms are
+summed across workers, gauges are reported per pid while their worker is alive.
+"""
+import asyncio
+import bisect
+import functools
+import glob
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.samples: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        sample = self.samples.get(labels)
+        if sample is None:
+            sample = self.samples[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        sample[0][bisect.bisect_left(self.buckets, value)] += 1
+        sample[1] += value
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labelnames": self.labelnames,
+            "buckets": self.buckets,
+            "samples": [[list(labels), counts, total] for labels, (counts, total) in self.samples.items()],
+        }
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.samples: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self.samples[labels] = value
+
+    def inc(self, amount: float = 1, *labels: str):
+        self.samples[labels] = self.samples.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels: str):
+        self.inc(-amount, *labels)
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labelnames": self.labelnames,
+            "samples": [[list(labels), value] for labels, value in self.samples.items()],
+        }
+
+
+class Timer:
+    """Context manager that observes its elapsed time into a histogram."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.enabled = settings.METRICS_ENABLED
+        self.directory = settings.METRICS_MULTIPROC_DIR
+        self.pid = os.getpid()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.metrics.setdefault(name, Gauge(name, help, labelnames))
+
+    def call_threadsafe(self, func: Callable, *args):
+        """Run a recording call on the event loop when invoked from another thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            func(*args)
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        # Forked workers inherit the module, so take the pid when the worker starts
+        self.pid = os.getpid()
+        self._tasks.append(asyncio.create_task(self._watch_loop_lag()))
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._tasks.append(asyncio.create_task(self._flush_periodically()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks.clear()
+        if self.enabled and self.directory:
+            self.flush()
+        self._loop = None
+
+    async def _watch_loop_lag(self):
+        interval = settings.METRICS_LOOP_LAG_INTERVAL_SECONDS
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - started - interval)
+            event_loop_lag.set(lag)
+            event_loop_lag_seconds.observe(lag)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Atomically replace this worker's snapshot file."""
+        path = os.path.join(self.directory, f"{self.pid}.json")
+        with open(path + ".tmp", "w") as snapshot_file:
+            json.dump({"pid": self.pid, "metrics": self.snapshot()}, snapshot_file)
+        os.replace(path + ".tmp", path)
+
+    def _snapshots(self) -> List[Tuple[int, dict, bool]]:
+        """(pid, metrics, alive) for every worker, this one always fresh."""
+        if not self.directory:
+            return [(self.pid, self.snapshot(), True)]
+
+        self.flush()
+        stale_after = settings.METRICS_FLUSH_INTERVAL_SECONDS * 3
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                alive = time.time() - os.path.getmtime(path) < stale_after
+                with open(path) as snapshot_file:
+                    data = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            snapshots.append((data["pid"], data["metrics"], alive or data["pid"] == self.pid))
+        return snapshots
+
+    def render(self) -> str:
+        snapshots = self._snapshots()
+        multiprocess = len(snapshots) > 1
+        merged: Dict[str, dict] = {}
+
+        for pid, metrics, alive in snapshots:
+            for name, metric in metrics.items():
+                target = merged.setdefault(name, {**metric, "samples": {}})
+                if metric["type"] == "histogram":
+                    for labels, counts, total in metric["samples"]:
+                        key = tuple(labels)
+                        previous = target["samples"].get(key)
+                        if previous is None:
+                            target["samples"][key] = [list(counts), total]
+                        else:
+                            previous[0] = [a + b for a, b in zip(previous[0], counts)]
+                            previous[1] += total
+                elif alive:
+                    # Gauges are per worker and vanish with it
+                    for labels, value in metric["samples"]:
+                        key = tuple(labels) + ((str(pid),) if multiprocess else ())
+                        target["samples"][key] = value
+
+        lines = []
+        for name, metric in merged.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = list(metric["labelnames"])
+            if metric["type"] == "histogram":
+                bounds = list(metric["buckets"]) + [float("inf")]
+                for labels, (counts, total) in metric["samples"].items():
+                    cumulative = 0
+                    for bound, count in zip(bounds, counts):
+                        cumulative += count
+                        le = f'le="{_format_bound(bound)}"'
+                        lines.append(f"{name}_bucket{_labels(labelnames, labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labelnames, labels)} {total}")
+                    lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+            else:
+                if multiprocess:
+                    labelnames.append("pid")
+                for labels, value in metric["samples"].items():
+                    lines.append(f"{name}{_labels(labelnames, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route, method and status.",
+    ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+stage_seconds = registry.histogram(
+    "auth_stage_duration_seconds", "Time spent in each stage of the auth hot path.", ("stage",)
+)
+db_command_seconds = registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by command and outcome.", ("command", "outcome")
+)
+db_pool_checkout_wait_seconds = registry.histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection.", ("outcome",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+db_pool_connections = registry.gauge("mongodb_pool_connections", "Open pooled connections by server.", ("address",))
+db_pool_checked_out = registry.gauge(
+    "mongodb_pool_checked_out_connections", "Pooled connections currently in use by server.", ("address",)
+)
+startup_seconds = registry.gauge("app_startup_seconds", "Time spent in each startup phase.", ("phase",))
+event_loop_lag = registry.gauge("event_loop_lag_seconds", "Most recent event loop scheduling delay.")
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_distribution_seconds", "Event loop scheduling delay.", buckets=LAG_BUCKETS
+)
+
+
+def stage(name: str) -> Timer:
+    """Time a block of the auth hot path: `with stage("jwt_encode"): ...`"""
+    return Timer(stage_seconds, (name,))
+
+
+def timed_stage(name: str):
+    """Decorator form of stage() for coroutine functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with Timer(stage_seconds, (name,)):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """Record request latency per route template, method and status, plus requests in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # The route template keeps label cardinality bounded; unmatched paths share one label
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Mongo command latency, taken from driver events and recorded on the event loop."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        registry.call_threadsafe(
+            db_command_seconds.observe, event.duration_micros / 1e6, event.command_name, "success"
+        )
+
+    def failed(self, event):
+        registry.call_threadsafe(
+            db_command_seconds.observe, event.duration_micros / 1e6, event.command_name, "failure"
+        )
+
+
+command_metrics = CommandMetrics()
+
+
+def _address(address) -> str:
+    return f"{address[0]}:{address[1]}"
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool checkout waits and occupancy, from the driver's CMAP events."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _checked_out(self, duration: float, address: str):
+        self.checkouts += 1
+        self.total_wait += duration
+        self.max_wait = max(self.max_wait, duration)
+        db_pool_checkout_wait_seconds.observe(duration, "success")
+        db_pool_checked_out.inc(1, address)
+
+    def _check_out_failed(self, duration: float, reason: str):
+        self.failures += 1
+        db_pool_checkout_wait_seconds.observe(duration, reason)
+
+    def connection_checked_out(self, event):
+        registry.call_threadsafe(self._checked_out, event.duration or 0.0, _address(event.address))
+
+    def connection_check_out_failed(self, event):
+        registry.call_threadsafe(self._check_out_failed, event.duration or 0.0, event.reason)
+
+    def connection_checked_in(self, event):
+        registry.call_threadsafe(db_pool_checked_out.dec, 1, _address(event.address))
+
+    def connection_created(self, event):
+        registry.call_threadsafe(db_pool_connections.inc, 1, _address(event.address))
+
+    def connection_closed(self, event):
+        registry.call_threadsafe(db_pool_connections.dec, 1, _address(event.address))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "failures": self.failures,
+            "mean_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+pool_metrics = PoolMetrics()
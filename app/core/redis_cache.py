@@ -0,0 +1,184 @@
+# redis_cache.py
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional, Set
+
+import bson
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def redis_url() -> str:
+    if settings.REDIS_OM_URL:
+        return settings.REDIS_OM_URL
+    auth = f":{settings.REDIS_PASSWORD}@" if settings.REDIS_PASSWORD else ""
+    return f"redis://{auth}{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+
+
+class RedisCache:
+    """
+    Shared L2 cache on Redis.
+    Entries are BSON-encoded, deletes are broadcast over pub/sub so every node can
+    evict its local copy, and any Redis failure turns reads and writes into no-ops
+    for retry_interval seconds instead of failing the request. Deletes are never
+    skipped: while Redis is down they are queued without waiting on it and the
+    listener sends them once it has reconnected. Nodes that lost their subscription
+    clear their local copies on reconnect, since they may have missed invalidations
+    meanwhile.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        client: Optional[aioredis.Redis] = None,
+        retry_interval: float = 5.0,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.channel = f"{namespace}:invalidate"
+        self._client = client
+        self._listener: Optional[asyncio.Task] = None
+        self._down_until = 0.0
+        self._pending_deletes: Set[str] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            pool = aioredis.ConnectionPool.from_url(
+                redis_url(),
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            )
+            self._client = aioredis.Redis(connection_pool=pool)
+        return self._client
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _mark_down(self, e: Exception):
+        self.errors += 1
+        if self.available:
+            logger.warning(f"Redis cache unavailable, falling back for {self.retry_interval}s: {e}")
+        self._down_until = time.monotonic() + self.retry_interval
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        if not self.available:
+            return default
+        try:
+            raw = await self.client.get(self._key(key))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._mark_down(e)
+            return default
+
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return bson.decode(raw)["v"]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if not self.available:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        try:
+            await self.client.set(self._key(key), bson.encode({"v": value}), px=int(ttl * 1000))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._mark_down(e)
+
+    async def delete(self, key: str):
+        """Delete the entry and tell every subscribed node to drop its local copy."""
+        # Queued rather than dropped while Redis is down: a lost invalidation serves stale users
+        self._pending_deletes.add(key)
+        if self.available:
+            await self._flush_deletes()
+
+    async def _flush_deletes(self) -> bool:
+        """Delete and publish every queued key; on failure they stay queued for the next attempt."""
+        keys = list(self._pending_deletes)
+        if not keys:
+            return True
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.delete(self._key(key))
+                    pipe.publish(self.channel, key)
+                await pipe.execute()
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._mark_down(e)
+            return False
+        self._pending_deletes.difference_update(keys)
+        return True
+
+    async def start(self, on_invalidate: Callable[[str], Any], on_reconnect: Optional[Callable[[], Any]] = None):
+        """
+        Start listening for invalidations published by other nodes.
+        on_reconnect runs whenever the subscription is re-established after a failure.
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(on_invalidate, on_reconnect))
+
+    async def _listen(self, on_invalidate: Callable[[str], Any], on_reconnect: Optional[Callable[[], Any]]):
+        interrupted = False
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    if interrupted:
+                        # Messages published while unsubscribed are gone
+                        if on_reconnect is not None:
+                            on_reconnect()
+                        interrupted = False
+                    if self._pending_deletes:
+                        await self._flush_deletes()
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=self.retry_interval
+                        )
+                        if message is not None and message["type"] == "message":
+                            on_invalidate(message["data"].decode())
+                        if self._pending_deletes:
+                            await self._flush_deletes()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                interrupted = True
+                self._mark_down(e)
+                await asyncio.sleep(self.retry_interval)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "pending_deletes": len(self._pending_deletes),
+        }
@@ -0,0 +1,43 @@
+# responses.py
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.schema.auth import StandardResponse
+
+
+class StandardJSONResponse(Response):
+    """
+    Serializes a StandardResponse envelope in a single pydantic-core pass.
+    Models are dumped by alias as FastAPI would, datetimes natively, and anything
+    else pydantic cannot serialize (ObjectId) falls back to str.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True, fallback=str)
+
+
+def standard_response(
+    status: bool,
+    message: str,
+    data: Any = None,
+    response: Optional[Response] = None,
+):
+    """
+    Build the StandardResponse envelope for a route.
+    With FAST_RESPONSES the envelope is serialized here, once, and FastAPI skips
+    response-model validation and jsonable_encoder; the route keeps
+    response_model=StandardResponse so the OpenAPI schema does not change.
+    Headers set on an injected Response are carried over on the fast path.
+    """
+    if not settings.FAST_RESPONSES:
+        return StandardResponse(status=status, data=data, message=message)
+
+    fast_response = StandardJSONResponse({"status": status, "data": data, "message": message})
+    if response is not None:
+        fast_response.raw_headers.extend(response.raw_headers)
+    return fast_response
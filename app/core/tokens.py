@@ -0,0 +1,161 @@
+# tokens.py
+"""
+Token engines: the one place tokens issued by this service are encoded and verified.
+
+JoseEngine handles every algorithm through python-jose and the KeyRing. HS256Engine
+is a fast path for the default HS256 setup: it keeps a prepared HMAC object and a
+pre-encoded header, and runs only the claim checks python-jose would apply to our
+tokens. Both produce byte-identical tokens, so they can be swapped freely.
+"""
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from jose import JWTError
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+
+from app.core.config import settings
+from app.core.keys import KeyRing, keyring
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _json(value: dict, sort_keys: bool = False) -> bytes:
+    # Same form python-jose uses (sorted header, unsorted payload), so both engines emit identical tokens
+    return json.dumps(value, separators=(",", ":"), sort_keys=sort_keys).encode()
+
+
+class TokenEngine(ABC):
+    name = "base"
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        ...
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        ...
+
+
+class JoseEngine(TokenEngine):
+    """python-jose backend; supports every algorithm the KeyRing does."""
+
+    name = "jose"
+
+    def __init__(self, keys: KeyRing):
+        self.keys = keys
+        self._secret_key = None
+        if not keys.asymmetric:
+            from jose import jwk
+
+            # Built once; given the raw secret, python-jose rebuilds the HMAC key for every token
+            self._secret_key = jwk.construct(keys.secret, keys.algorithm)
+
+    def encode(self, claims: dict) -> str:
+        if self._secret_key is None:
+            return self.keys.encode(claims)
+        from jose import jwt
+
+        return jwt.encode(claims, self._secret_key, algorithm=self.keys.algorithm)
+
+    def decode(self, token: str) -> dict:
+        if self._secret_key is None:
+            return self.keys.decode(token)
+        from jose import jwt
+
+        return jwt.decode(token, self._secret_key, algorithms=[self.keys.algorithm])
+
+
+class HS256Engine(TokenEngine):
+    """Fast path for HS256 with a fixed secret."""
+
+    name = "hs256"
+
+    def __init__(self, secret: str):
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self._header = _b64encode(_json({"alg": "HS256", "typ": "JWT"}, sort_keys=True))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict) -> str:
+        claims = dict(claims)
+        for claim in ("exp", "iat", "nbf"):
+            if isinstance(claims.get(claim), datetime):
+                claims[claim] = calendar.timegm(claims[claim].utctimetuple())
+
+        signing_input = self._header + b"." + _b64encode(_json(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> dict:
+        try:
+            signing_input, signature = token.encode().rsplit(b".", 1)
+            header, payload = signing_input.split(b".")
+            if header != self._header and json.loads(_b64decode(header)).get("alg") != "HS256":
+                raise JWTError("The specified alg value is not allowed")
+            signature = _b64decode(signature)
+        except JWTError:
+            raise
+        except Exception:
+            raise JWTError("Invalid token")
+
+        if not hmac.compare_digest(self._sign(signing_input), signature):
+            raise JWTError("Signature verification failed.")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except Exception:
+            raise JWTError("Invalid payload string")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload string: must be a json object")
+
+        self._validate(claims)
+        return claims
+
+    @staticmethod
+    def _validate(claims: dict):
+        now = time.time()
+        for claim in ("exp", "iat", "nbf"):
+            if claim in claims and not isinstance(claims[claim], (int, float)):
+                raise JWTClaimsError(f"{claim} claim must be a number")
+        if "nbf" in claims and claims["nbf"] > now:
+            raise JWTClaimsError("The token is not yet valid (nbf)")
+        if "exp" in claims and claims["exp"] < now:
+            raise ExpiredSignatureError("Signature has expired.")
+        if "aud" in claims:
+            # We never issue audiences; python-jose rejects them when none is expected
+            raise JWTClaimsError("Invalid audience")
+        if "sub" in claims and not isinstance(claims["sub"], str):
+            raise JWTClaimsError("Subject must be a string.")
+
+
+ENGINES = {
+    "jose": lambda: JoseEngine(keyring),
+    "hs256": lambda: HS256Engine(settings.JWT_SECRET_KEY),
+}
+
+
+def build_engine(name: str) -> TokenEngine:
+    if name == "auto":
+        name = "hs256" if settings.JWT_ALGORITHM == "HS256" else "jose"
+    if name == "hs256" and settings.JWT_ALGORITHM != "HS256":
+        raise ValueError(f"The hs256 token engine cannot sign {settings.JWT_ALGORITHM}")
+    if name not in ENGINES:
+        raise ValueError(f"Unknown token engine: {name}")
+    return ENGINES[name]()
+
+
+token_engine = build_engine(settings.JWT_ENGINE)
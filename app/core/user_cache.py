@@ -0,0 +1,96 @@
+# user_cache.py
+from typing import TYPE_CHECKING, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.core.redis_cache import RedisCache
+
+# Returned by UserCache.get when nothing is cached for the id
+MISSING = object()
+
+
+class UserCache:
+    """
+    Principal cache keyed by user id, including negative entries for unknown ids.
+    L1 is an in-process TTL+LRU cache; the optional L2 is shared through Redis.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        negative_ttl: float,
+        enabled: bool = True,
+        shared: Optional["RedisCache"] = None,
+    ):
+        self.enabled = enabled
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self._local = TTLCache(max_size, ttl)
+
+    async def start(self):
+        if self.enabled and self.shared is not None:
+            await self.shared.start(self._local.invalidate, on_reconnect=self._local.clear)
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+    async def get(self, user_id: str):
+        """Return the cached user document, None for a known-missing id, or MISSING."""
+        if not self.enabled:
+            return MISSING
+
+        user = self._local.get(user_id, MISSING)
+        if user is MISSING and self.shared is not None:
+            user = await self.shared.get(user_id, MISSING)
+            if user is not MISSING:
+                self._set_local(user_id, user)
+        return user
+
+    async def set(self, user_id: str, user: Optional[dict]):
+        if not self.enabled:
+            return
+        self._set_local(user_id, user)
+        if self.shared is not None:
+            await self.shared.set(user_id, user, ttl=self.negative_ttl if user is None else None)
+
+    def _set_local(self, user_id: str, user: Optional[dict]):
+        if user is None:
+            self._local.set(user_id, None, ttl=self.negative_ttl)
+        else:
+            self._local.set(user_id, user)
+
+    async def invalidate(self, user_id: str):
+        self._local.invalidate(user_id)
+        if self.shared is not None:
+            await self.shared.delete(user_id)
+
+    def stats(self) -> dict:
+        stats = {"local": self._local.stats()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+def _shared_cache() -> Optional["RedisCache"]:
+    # Only import the Redis client when the shared cache is in use
+    if not settings.REDIS_CACHE_ENABLED:
+        return None
+    from app.core.redis_cache import RedisCache
+
+    return RedisCache(
+        namespace=f"{settings.REDIS_CACHE_NAMESPACE}:users",
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+    )
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+    enabled=settings.USER_CACHE_ENABLED,
+    shared=_shared_cache(),
+)
@@ -1,55 +1,127 @@
+import asyncio
 from fastapi import logger
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import IndexModel, ASCENDING
+from pymongo import ReadPreference
 from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
 from app.core.config import settings
+from app.core.metrics import command_metrics, pool_metrics
+from app.db.indexes import ensure_indexes
+from app.db.profiler import query_profiler
 import logging
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
 logging.basicConfig(level=logging.INFO)
 
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
 class Database:
-    client: AsyncIOMotorClient = None
-    
+    client: "AsyncIOMotorClient" = None
+    _lock: Optional[asyncio.Lock] = None
+    _routed: Dict[str, "AsyncIOMotorDatabase"] = {}
+    _index_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _connect_lock(cls) -> asyncio.Lock:
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        return cls._lock
+
     @classmethod
     async def connect_db(cls):
-        try:
-            cls.client = AsyncIOMotorClient(settings.MONGODB_URL)
-            
-            await cls.client.admin.command("ping")
-            
-            
-            # Create indexes
-            db = cls.client.flight_tracker
-            
-            await db.users.create_indexes([
-                IndexModel([("email", ASCENDING)], unique=True),
-                IndexModel([("auth_provider", ASCENDING)]),
-            ])
-            
-            
-
-            # Get the list of available collections in the database
-        
-            collection_names = await db.list_collection_names()
+        # Concurrent first callers wait here for a single client instead of each creating a pool
+        async with cls._connect_lock():
+            if cls.client is not None:
+                return True
+
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[command_metrics, pool_metrics, query_profiler],
+            )
+            db = client[settings.DB_NAME]
+            index_mode = cls.index_mode()
+            collection_names = None
+            try:
+                # With FAST_STARTUP the driver connects on the first real operation instead
+                if not settings.FAST_STARTUP:
+                    await client.admin.command("ping")
+
+                # Create indexes
+                if index_mode == "create":
+                    await ensure_indexes(db)
+
+                # Get the list of available collections in the database
+                if not settings.FAST_STARTUP:
+                    collection_names = await db.list_collection_names()
+            except Exception as e:
+                client.close()
+                logging.error(f"MongoDB connection failed: {e}")
+                raise
+
+            cls.client = client
+            cls._routed = {}
+            if index_mode == "background":
+                cls._index_task = asyncio.create_task(cls._ensure_indexes_in_background(db))
+
             logging.info("Connected to the database.")
-            logging.info("Available collections:")
-            for collection_name in collection_names:
-                logging.info(collection_name)
+            if collection_names is not None:
+                logging.info("Available collections:")
+                for collection_name in collection_names:
+                    logging.info(collection_name)
 
             return True
+
+    @staticmethod
+    def index_mode() -> str:
+        mode = settings.STARTUP_INDEXES or ("background" if settings.FAST_STARTUP else "create")
+        if mode not in ("create", "background", "skip"):
+            raise ValueError(f"Unknown STARTUP_INDEXES mode: {mode}")
+        return mode
+
+    @classmethod
+    async def _ensure_indexes_in_background(cls, db):
+        try:
+            await ensure_indexes(db)
         except Exception as e:
-            logging.error(f"MongoDB connection failed: {e}")
-            raise
-    
+            logging.error(f"Background index creation failed: {e}")
+
     @classmethod
     async def close_db(cls):
+        if cls._index_task is not None:
+            cls._index_task.cancel()
+            cls._index_task = None
         if cls.client is not None:
-            await cls.client.close()
+            cls.client.close()
+            cls.client = None
+            cls._routed = {}
         else:
             logging.warning("Attempted to close a database connection, but no client was initialized.")
-    
+
     @classmethod
-    async def get_db(cls):
+    async def get_db(cls, read_preference: Optional[str] = None):
+        """Return the application database, optionally routed with a per-operation read preference."""
         if cls.client is None:
             await cls.connect_db()
-        return cls.client.flight_tracker
+        db = cls.client[settings.DB_NAME]
+        if read_preference is None or read_preference == "primary":
+            return db
+        if read_preference not in cls._routed:
+            if read_preference not in READ_PREFERENCES:
+                raise ValueError(f"Unknown read preference: {read_preference}")
+            cls._routed[read_preference] = db.with_options(read_preference=READ_PREFERENCES[read_preference])
+        return cls._routed[read_preference]
@@ -0,0 +1,257 @@
+"""
+Declarative index registry.
+
+INDEXES lists the indexes every collection must have; ensure_indexes applies them
+idempotently at startup and drops the ones listed in RETIRED_INDEXES.
+QUERY_SHAPES lists one example of every query the services issue, reads and
+filtered writes alike, and verify_query_plans explains each one and reports any
+that would need a collection scan (tests/test_query_plans.py runs it against
+MONGODB_TEST_URL).
+
+Usage:
+    python -m app.db.indexes --apply --check
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation
+
+# Case-insensitive comparison for email lookups
+EMAIL_COLLATION = Collation(locale="en", strength=2)
+
+# Keyset orders of the admin user listing: newest first, and prefix searches by the searched field
+LIST_ORDERS = {
+    "created_at": {"created_at": -1, "_id": -1},
+    "email": {"email": 1},  # unique, so no tie-breaker is needed
+    "full_name": {"full_name": 1, "_id": 1},
+}
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("auth_provider", ASCENDING)]),
+        # Serves the admin listing's case-insensitive exact email filter
+        IndexModel([("email", ASCENDING)], name="email_ci", collation=EMAIL_COLLATION),
+        # Admin listing: newest first, _id breaking ties, optionally after one equality filter
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("auth_provider", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("is_verified", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("full_name", ASCENDING), ("_id", ASCENDING)]),
+    ],
+}
+
+# Indexes that registered ones made redundant; ensure_indexes drops them
+RETIRED_INDEXES = {
+    # Email equality is already unique, so the unique email index serves {email, auth_provider}
+    "users": [
+        "email_1_auth_provider_1",
+        # Superseded by (full_name, _id), which also provides the name search order
+        "full_name_1",
+    ],
+}
+
+QUERY_SHAPES = [
+    {
+        "name": "user_by_id",
+        "collection": "users",
+        "filter": {"_id": ObjectId()},
+    },
+    {
+        "name": "user_by_email",
+        "collection": "users",
+        "filter": {"email": "user@example.com"},
+    },
+    {
+        "name": "users_by_ids",
+        "collection": "users",
+        "filter": {"_id": {"$in": [ObjectId(), ObjectId()]}},
+    },
+    {
+        "name": "social_login_upsert",
+        "collection": "users",
+        "command": "findAndModify",
+        "filter": {"email": "user@example.com", "auth_provider": "google"},
+        "update": {"$set": {"last_login": datetime(2024, 1, 1)}, "$setOnInsert": {"is_active": True}},
+        "upsert": True,
+    },
+    {
+        "name": "profile_update",
+        "collection": "users",
+        "command": "findAndModify",
+        "filter": {"_id": ObjectId()},
+        "update": {"$set": {"full_name": "Jane"}},
+    },
+    {
+        "name": "user_update_by_id",
+        "collection": "users",
+        "command": "update",
+        "filter": {"_id": ObjectId()},
+        "update": {"$set": {"last_login": datetime(2024, 1, 1)}},
+    },
+    {
+        "name": "password_rehash",
+        "collection": "users",
+        "command": "update",
+        "filter": {"_id": ObjectId(), "hashed_password": "$2b$12$old"},
+        "update": {"$set": {"hashed_password": "$2b$12$new"}},
+    },
+    {
+        "name": "users_newest_first",
+        "collection": "users",
+        "filter": {},
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+    {
+        "name": "users_after_cursor",
+        "collection": "users",
+        "filter": {"$or": [
+            {"created_at": {"$lt": datetime(2024, 1, 1)}},
+            {"created_at": datetime(2024, 1, 1), "_id": {"$lt": ObjectId()}},
+        ]},
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+    {
+        "name": "users_by_provider",
+        "collection": "users",
+        "filter": {"auth_provider": "google"},
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+    {
+        "name": "users_by_verification",
+        "collection": "users",
+        "filter": {"is_verified": False},
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+    {
+        "name": "users_created_between",
+        "collection": "users",
+        "filter": {"created_at": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)}},
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+    {
+        "name": "users_by_email_prefix",
+        "collection": "users",
+        "filter": {"email": {"$regex": "^jane"}},
+        "sort": LIST_ORDERS["email"],
+        "limit": 51,
+    },
+    {
+        "name": "users_by_name_prefix_after_cursor",
+        "collection": "users",
+        "filter": {"$and": [
+            {"full_name": {"$regex": "^Jane"}},
+            {"$or": [{"full_name": {"$gt": "Jane D"}}, {"full_name": "Jane D", "_id": {"$gt": ObjectId()}}]},
+        ]},
+        "sort": LIST_ORDERS["full_name"],
+        "limit": 51,
+    },
+    {
+        "name": "users_by_email_case_insensitive",
+        "collection": "users",
+        "filter": {"email": "Jane@Example.com"},
+        "collation": EMAIL_COLLATION.document,
+        "sort": LIST_ORDERS["created_at"],
+        "limit": 51,
+    },
+]
+
+
+async def ensure_indexes(db):
+    """Create any registered index that does not exist yet."""
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        for name in RETIRED_INDEXES.get(collection, []):
+            if name in existing:
+                await db[collection].drop_index(name)
+                logging.info(f"Dropped retired index {collection}.{name}")
+        missing = []
+        for model in models:
+            spec = model.document
+            current = existing.get(spec["name"])
+            if current is None:
+                missing.append(model)
+            elif list(current["key"]) != list(spec["key"].items()):
+                logging.warning(f"Index {collection}.{spec['name']} exists with a different key, leaving it alone")
+
+        if missing:
+            await db[collection].create_indexes(missing)
+            logging.info(f"Created indexes on {collection}: {[m.document['name'] for m in missing]}")
+
+
+def _command(shape: dict) -> dict:
+    """The command document a shape describes: a find, a findAndModify, or an update."""
+    command = shape.get("command", "find")
+    if command == "findAndModify":
+        return {
+            "findAndModify": shape["collection"],
+            "query": shape["filter"],
+            "update": shape["update"],
+            "upsert": shape.get("upsert", False),
+        }
+    if command == "update":
+        return {
+            "update": shape["collection"],
+            "updates": [{"q": shape["filter"], "u": shape["update"], "upsert": shape.get("upsert", False)}],
+        }
+    find = {"find": shape["collection"], "filter": shape["filter"]}
+    for option in ("sort", "projection", "collation", "limit"):
+        if option in shape:
+            find[option] = shape[option]
+    return find
+
+
+def _has_collscan(plan) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(value) for value in plan)
+    return False
+
+
+async def verify_query_plans(db) -> list:
+    """Explain every registered query shape and return the names of those that scan the collection."""
+    failures = []
+    for shape in QUERY_SHAPES:
+        explain = await db.command({"explain": _command(shape), "verbosity": "queryPlanner"})
+        if _has_collscan(explain["queryPlanner"]["winningPlan"]):
+            failures.append(shape["name"])
+    return failures
+
+
+async def main(apply: bool, check: bool) -> int:
+    from app.db.config import Database
+
+    db = await Database.get_db()
+    try:
+        if apply:
+            await ensure_indexes(db)
+        if check:
+            failures = await verify_query_plans(db)
+            for name in failures:
+                logging.error(f"Query shape {name} needs a COLLSCAN")
+            if failures:
+                return 1
+            logging.info(f"All {len(QUERY_SHAPES)} query shapes are served by an index")
+        return 0
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply registered indexes and verify query plans.")
+    parser.add_argument("--apply", action="store_true", help="create missing indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any query shape needs a COLLSCAN")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.apply, args.check)))
@@ -0,0 +1,206 @@
+# db/profiler.py
+"""
+Per-query-shape MongoDB statistics from the driver's command events.
+
+Every command is reduced to its shape: the command, the collection, and the
+filter, update, sort and projection with every literal replaced by "?". Counts
+and latency percentiles are aggregated per shape, and commands slower than
+MONGO_SLOW_OPERATION_MS are logged by shape, so no user data reaches the log.
+Statistics are per worker process.
+"""
+import json
+import logging
+import math
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Handshake, auth and session housekeeping that says nothing about the workload
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "buildinfo", "endSessions",
+    "saslStart", "saslContinue", "getnonce", "authenticate", "killCursors",
+}
+
+# Parts of each command that define its shape: True strips literals, False keeps the value
+SHAPE_FIELDS = {
+    "find": {"filter": True, "sort": False, "projection": False, "hint": False},
+    "findAndModify": {"query": True, "sort": False, "fields": False, "update": True, "upsert": False, "new": False},
+    "update": {"updates": {"q": True, "u": True, "upsert": False, "multi": False, "collation": False}},
+    "delete": {"deletes": {"q": True, "limit": False, "collation": False}},
+    "aggregate": {"pipeline": True},
+    "count": {"query": True},
+    "distinct": {"key": False, "query": True},
+    "createIndexes": {"indexes": False},
+}
+
+# Pipeline stages whose arguments are structural rather than data
+STRUCTURAL_STAGES = {"$sort", "$project", "$group", "$unwind", "$lookup", "$count"}
+
+
+def _strip(value):
+    """Replace literals with "?", keeping field names and operators."""
+    if isinstance(value, dict):
+        return {key: _strip(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists and array literals of any length share one shape
+        if not any(isinstance(item, (dict, list, tuple)) for item in value):
+            return "?"
+        return [_strip(item) for item in value]
+    return "?"
+
+
+def _strip_pipeline(pipeline):
+    return [
+        {op: (body if op in STRUCTURAL_STAGES else _strip(body)) for op, body in stage.items()}
+        for stage in pipeline
+    ]
+
+
+def _shape_of(document: dict, fields: dict) -> dict:
+    shape = {}
+    for field, rule in fields.items():
+        if field not in document:
+            continue
+        value = document[field]
+        if isinstance(rule, dict):
+            # Batched writes: one entry per distinct statement shape
+            statements = []
+            for statement in value:
+                statement_shape = _shape_of(statement, rule)
+                if statement_shape not in statements:
+                    statements.append(statement_shape)
+            shape[field] = statements
+        elif field == "pipeline":
+            shape[field] = _strip_pipeline(value)
+        else:
+            shape[field] = _strip(value) if rule else value
+    return shape
+
+
+def query_shape(command_name: str, command: dict) -> Tuple[str, str]:
+    """Return (collection, shape) for a command document."""
+    collection = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    collection = collection if isinstance(collection, str) else "?"
+    shape = _shape_of(command, SHAPE_FIELDS.get(command_name, {}))
+    return collection, f"{command_name} {collection} {json.dumps(shape, default=str)}"
+
+
+def _percentile(ordered, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class ShapeStats:
+    __slots__ = ("command", "collection", "count", "failures", "slow", "total", "max", "recent")
+
+    def __init__(self, command: str, collection: str, samples: int):
+        self.command = command
+        self.collection = collection
+        self.count = 0
+        self.failures = 0
+        self.slow = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=samples)
+
+    def to_dict(self, shape: str) -> dict:
+        ordered = sorted(self.recent)
+        return {
+            "shape": shape,
+            "command": self.command,
+            "collection": self.collection,
+            "count": self.count,
+            "failures": self.failures,
+            "slow": self.slow,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """
+    Pairs command started and finished events, then aggregates on the event loop.
+    The started event is the only one that carries the command document.
+    """
+
+    OVERFLOW_SHAPE = "other"
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        slow_ms: float = 100,
+        max_shapes: int = 500,
+        samples: int = 1024,
+    ):
+        self.enabled = enabled
+        self.slow_seconds = slow_ms / 1000
+        self.max_shapes = max_shapes
+        self.samples = samples
+        self.shapes: Dict[str, ShapeStats] = {}
+        self._pending: Dict[Tuple[object, int], Tuple[str, str, str]] = {}
+
+    def started(self, event):
+        if not self.enabled or event.command_name in IGNORED_COMMANDS:
+            return
+        collection, shape = query_shape(event.command_name, event.command)
+        self._pending[(event.connection_id, event.request_id)] = (event.command_name, collection, shape)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def _finished(self, event, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        command, collection, shape = pending
+        duration = event.duration_micros / 1e6
+        slow = duration >= self.slow_seconds
+        if slow:
+            logger.warning(f"Slow MongoDB {command} on {collection} took {duration * 1000:.1f} ms: {shape}")
+        registry.call_threadsafe(self._record, command, collection, shape, duration, failed, slow)
+
+    def _record(self, command: str, collection: str, shape: str, duration: float, failed: bool, slow: bool):
+        stats = self.shapes.get(shape)
+        if stats is None:
+            if len(self.shapes) >= self.max_shapes:
+                # Unbounded shapes usually mean literals leaking into keys; cap the table
+                shape, command, collection = self.OVERFLOW_SHAPE, "?", "?"
+                stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = ShapeStats(command, collection, self.samples)
+        stats.count += 1
+        stats.failures += failed
+        stats.slow += slow
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+        stats.recent.append(duration)
+
+    def report(self, sort: str = "total_ms", limit: Optional[int] = None) -> list:
+        rows = [stats.to_dict(shape) for shape, stats in self.shapes.items()]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self):
+        self.shapes.clear()
+
+
+query_profiler = QueryProfiler(
+    enabled=settings.MONGO_PROFILER_ENABLED,
+    slow_ms=settings.MONGO_SLOW_OPERATION_MS,
+    max_shapes=settings.MONGO_PROFILER_MAX_SHAPES,
+    samples=settings.MONGO_PROFILER_SAMPLES_PER_SHAPE,
+)
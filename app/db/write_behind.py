@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.db.config import Database
+
+logger = logging.getLogger(__name__)
+
+
+class LoginStampBuffer:
+    """
+    Write-behind buffer for last_login/updated_at stamps.
+    Updates are coalesced per user id and flushed by a background task with one
+    unordered bulk_write once max_size users are pending or flush_interval seconds
+    have passed. Logins never wait for the database: while it is unreachable,
+    stamps keep coalescing and, past max_pending users, new ones are dropped.
+    """
+
+    def __init__(self, max_size: int, flush_interval: float, max_pending: int):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Shutdown must go on even if the database is unreachable
+        await self._safe_flush()
+
+    async def record(self, user_id: str, fields: dict):
+        """Queue fields to $set on the user, overwriting any stamp still pending."""
+        self.recorded += 1
+        if not self._enqueue(user_id, fields):
+            return
+        if len(self._pending) >= self.max_size:
+            self._wake.set()
+
+    def _enqueue(self, user_id: str, fields: dict, overwrite: bool = True) -> bool:
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            if overwrite:
+                pending.update(fields)
+            return True
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._pending[user_id] = dict(fields)
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not await self._safe_flush():
+                # Back off instead of retrying on every wake-up while the database is down
+                await asyncio.sleep(self.flush_interval)
+
+    async def _safe_flush(self) -> bool:
+        try:
+            await self.flush()
+            return True
+        except Exception as e:
+            logger.error(f"Login stamp flush failed: {e}")
+            return False
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+
+            started = time.monotonic()
+            try:
+                db = await Database.get_db()
+                await db.users.bulk_write(
+                    [UpdateOne({"_id": ObjectId(user_id)}, {"$set": fields}) for user_id, fields in batch.items()],
+                    ordered=False
+                )
+            except BaseException:
+                # Also on cancellation, so stop() can still flush what a cancelled flush held
+                self.failures += 1
+                # Keep the stamps for the next flush unless newer ones arrived meanwhile
+                for user_id, fields in batch.items():
+                    self._enqueue(user_id, fields, overwrite=False)
+                raise
+            finally:
+                self.last_flush_latency = time.monotonic() - started
+                self.max_flush_latency = max(self.max_flush_latency, self.last_flush_latency)
+
+            self.flushes += 1
+            self.flushed += len(batch)
+            for user_id in batch:
+                await user_cache.invalidate(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._pending),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failures": self.failures,
+            "last_flush_ms": self.last_flush_latency * 1000,
+            "max_flush_ms": self.max_flush_latency * 1000,
+        }
+
+
+login_stamps = LoginStampBuffer(
+    max_size=settings.LOGIN_STAMP_BATCH_SIZE,
+    flush_interval=settings.LOGIN_STAMP_FLUSH_SECONDS,
+    max_pending=settings.LOGIN_STAMP_MAX_PENDING,
+)
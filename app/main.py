@@ -4,47 +4,115 @@
 import asyncio
 import logging
 import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+
+_import_started = time.perf_counter()
 
 # Third-party imports
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-import uvicorn
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.memory import MemoryJobStore
 
 # Local application imports
 
 from app.db.config import Database
+from app.db.write_behind import login_stamps
 from app.core.config import settings
+from app.core.hashing import get_pwd_context, password_hasher
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry, startup_seconds
+from app.core.user_cache import user_cache
+from app.services.http_client import http_client
+from app.services.user_loader import IdentityMapMiddleware
 from app.routes.index import router as index_route
+from app.routes.metrics import router as metrics_route
+from app.routes.well_known import router as well_known_route
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Configure scheduler
-jobstores = {"default": MemoryJobStore()}
-scheduler = AsyncIOScheduler(jobstores=jobstores, timezone="Africa/Accra")
+# Scheduled jobs as (coroutine function, trigger, trigger arguments), e.g.
+# (send_digest, "cron", {"day_of_week": "mon", "hour": 9}). APScheduler is only
+# imported and started when there is at least one.
+scheduled_jobs = []
+scheduler = None
+
+# Seconds spent in each startup phase, from the import of this module on
+startup_timings: Dict[str, float] = {}
 
 router = APIRouter()
 
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - started
+
+
+def start_scheduler():
+    from apscheduler.jobstores.memory import MemoryJobStore
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    jobstores = {"default": MemoryJobStore()}
+    job_scheduler = AsyncIOScheduler(jobstores=jobstores, timezone="Africa/Accra")
+    for func, trigger, trigger_args in scheduled_jobs:
+        job_scheduler.add_job(func, trigger, **trigger_args)
+    job_scheduler.start()
+    return job_scheduler
+
+
+def report_startup():
+    total = sum(startup_timings.values())
+    for phase, seconds in startup_timings.items():
+        startup_seconds.set(seconds, phase)
+    breakdown = ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in startup_timings.items())
+    mode = "fast" if settings.FAST_STARTUP else "standard"
+    logger.info(f"Startup ({mode}) took {total * 1000:.1f} ms: {breakdown}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle events"""
+    global scheduler
     try:
         # Startup logic
-        mongodb = await Database.connect_db()
+        with startup_phase("connect_db"):
+            mongodb = await Database.connect_db()
         if not mongodb:
             logger.error("MongoDB connection failed. Exiting the app.")
             sys.exit(1)
 
-        scheduler.start()
+        with startup_phase("metrics"):
+            await metrics_registry.start()
+        with startup_phase("user_cache"):
+            await user_cache.start()
+        await login_stamps.start()
+        if not settings.FAST_STARTUP:
+            # Otherwise these are set up by the first request that needs them
+            with startup_phase("http_client"):
+                await http_client.start()
+            with startup_phase("password_context"):
+                get_pwd_context()
+        if scheduled_jobs:
+            with startup_phase("scheduler"):
+                scheduler = start_scheduler()
+        report_startup()
         yield  # Run the application
         
     finally:
         # Shutdown logic
-        scheduler.shutdown()
+        if scheduler is not None:
+            scheduler.shutdown()
+            scheduler = None
+        await login_stamps.stop()
+        password_hasher.shutdown()
+        await user_cache.close()
+        await http_client.close()
         await Database.close_db()
+        await metrics_registry.stop()
         
 
 # Initialize FastAPI app with configuration
@@ -65,10 +133,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@scheduler.scheduled_job('cron', day_of_week='mon', hour=9, minute=0)
-async def schedule():
-    pass
+app.add_middleware(IdentityMapMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @router.get("/")
 def root():
@@ -80,6 +146,8 @@ def root():
     
 # Include API routes
 app.include_router(router)
+app.include_router(well_known_route)
+app.include_router(metrics_route)
 app.include_router(index_route, prefix=settings.API_V1_STR)
 
-
+startup_timings["import"] = time.perf_counter() - _import_started
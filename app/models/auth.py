@@ -3,6 +3,8 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from app.core.config import settings
+
 
 class GoogleAuthRequest(BaseModel):
     code: str
@@ -19,3 +21,7 @@ class SocialProfile(BaseModel):
 class LoginRequest(BaseModel):
     email: str
     password: str
+
+class BatchIntrospectionRequest(BaseModel):
+    # Rejected while parsing, before any token is looked at
+    tokens: List[str] = Field(max_length=settings.INTROSPECTION_MAX_TOKENS)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+# Fields loaded for every authenticated request; never includes hashed_password
+PRINCIPAL_FIELDS = (
+    "email",
+    "full_name",
+    "phone_number",
+    "auth_provider",
+    "is_active",
+    "is_verified",
+    "created_at",
+    "updated_at",
+    "last_login",
+)
+PRINCIPAL_PROJECTION = {field: 1 for field in PRINCIPAL_FIELDS}
+
+
+class Principal:
+    """
+    The authenticated user as most handlers need it.
+    A plain slotted object built from a projected document, so requests skip
+    pydantic validation and the password hash never leaves the database.
+    Routes that need the whole profile depend on AuthHandler.get_current_user.
+    """
+
+    __slots__ = ("id",) + PRINCIPAL_FIELDS
+
+    def __init__(self, user: dict):
+        self.id: str = str(user["_id"])
+        self.email: str = user["email"]
+        self.full_name: Optional[str] = user.get("full_name")
+        self.phone_number: Optional[str] = user.get("phone_number")
+        self.auth_provider: str = user.get("auth_provider", "local")
+        self.is_active: bool = user.get("is_active", True)
+        self.is_verified: bool = user.get("is_verified", False)
+        self.created_at: datetime = user.get("created_at")
+        self.updated_at: datetime = user.get("updated_at")
+        self.last_login: Optional[datetime] = user.get("last_login")
@@ -0,0 +1,95 @@
+# routes/admin.py
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from app.core.auth import AuthHandler
+from app.core.config import settings
+from app.core.metrics import pool_metrics
+from app.core.responses import standard_response
+from app.db.profiler import query_profiler
+from app.models.user import AuthProvider
+from app.schema.auth import StandardResponse
+from app.services.bulk_user_service import bulk_user_service
+
+router = APIRouter(dependencies=[Depends(AuthHandler.require_admin)])
+
+BulkFormat = Literal["ndjson", "csv"]
+ShapeSort = Literal["count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "slow", "failures"]
+
+
+@router.get("/db/query-shapes", response_model=StandardResponse)
+async def get_query_shapes(
+    sort: ShapeSort = "total_ms",
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """
+    MongoDB statistics per query shape for this worker process, slowest first.
+    Shapes have every literal replaced by "?".
+    """
+    try:
+        return standard_response(
+            status=True,
+            data={
+                "pid": os.getpid(),
+                "slow_operation_ms": settings.MONGO_SLOW_OPERATION_MS,
+                "pool": pool_metrics.stats(),
+                "shapes": query_profiler.report(sort=sort, limit=limit),
+            },
+            message="Query shapes retrieved successfully"
+        )
+    except Exception as e:
+        return standard_response(
+            status=False,
+            message=f"Failed to retrieve query shapes: {str(e)}"
+        )
+
+
+@router.delete("/db/query-shapes", response_model=StandardResponse)
+async def reset_query_shapes():
+    """Start a fresh measurement window for this worker process."""
+    query_profiler.reset()
+    return standard_response(status=True, message="Query shape statistics reset")
+
+
+@router.post(
+    "/users/import",
+    response_model=StandardResponse,
+    openapi_extra={"requestBody": {"content": {
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        "text/csv": {"schema": {"type": "string"}},
+    }}}
+)
+async def import_users(request: Request, format: Optional[BulkFormat] = None):
+    """
+    Create local accounts from an NDJSON or CSV body (header row with email, full_name,
+    password and optionally phone_number), streamed rather than buffered.
+    Invalid and duplicate rows are reported by row number and do not stop the import.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        report = await bulk_user_service.import_users(
+            request.stream(),
+            fmt,
+            max_errors=settings.BULK_IMPORT_MAX_REPORTED_ERRORS
+        )
+        return standard_response(
+            status=True,
+            data=report.to_dict(),
+            message=f"Imported {report.inserted} of {report.received} users"
+        )
+    except Exception as e:
+        return standard_response(
+            status=False,
+            message=f"User import failed: {str(e)}"
+        )
+
+
+@router.get("/users/export")
+async def export_users(format: BulkFormat = "ndjson", auth_provider: Optional[AuthProvider] = None):
+    """Stream every user, without password hashes, as NDJSON or CSV."""
+    return StreamingResponse(
+        bulk_user_service.export_users(format, auth_provider.value if auth_provider else None),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
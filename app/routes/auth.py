@@ -1,26 +1,31 @@
 # routes/auth.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from app.core.auth import AuthHandler
-from app.models.auth import AppleAuthRequest, GoogleAuthRequest, LoginRequest
-from app.models.user import UserCreate, UserInDB, UserVerificationResponse
+from app.core.etag import etag_matches, not_modified, set_cache_headers, user_etag
+from app.models.auth import AppleAuthRequest, BatchIntrospectionRequest, GoogleAuthRequest, LoginRequest
+from app.models.principal import Principal
+from app.models.user import UserCreate, UserVerificationResponse
+from app.core.responses import standard_response
 from app.schema.auth import StandardResponse
 from app.services.auth_service import AuthService
+from app.services.introspection_service import IntrospectionService
 
 router = APIRouter()
 auth_service = AuthService()
+introspection_service = IntrospectionService()
 
 @router.post("/register", response_model=StandardResponse)
 async def register(user: UserCreate):
     """Register a new user with email and password."""
     try:
         user_data = await auth_service.register_user(user)
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=user_data,
             message="User registered successfully"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Registration failed: {str(e)}"
         )
@@ -30,13 +35,13 @@ async def login(login_request: LoginRequest):
     """Authenticate user with email and password."""
     try:
         token = await auth_service.login_user(login_request.email, login_request.password)
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=token,
             message="Login successful"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Login failed: {str(e)}"
         )
@@ -46,13 +51,13 @@ async def refresh_token(refresh_token: str):
     """Generate new access and refresh tokens using a valid refresh token."""
     try:
         token = auth_service.refresh_user_token(refresh_token)
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=token,
             message="Tokens refreshed successfully"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Token refresh failed: {str(e)}"
         )
@@ -62,13 +67,13 @@ async def authenticate_with_google(auth_request: GoogleAuthRequest):
     """Handle Google Sign-In with ID token."""
     try:
         token = await auth_service.authenticate_with_google(auth_request)
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=token,
             message="Google authentication successful"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Google authentication failed: {str(e)}"
         )
@@ -77,28 +82,64 @@ async def authenticate_with_google(auth_request: GoogleAuthRequest):
 async def authenticate_with_apple(auth_request: AppleAuthRequest):
     try:
         token = await auth_service.authenticate_with_apple(auth_request)
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=token,
             message="Apple authentication successful"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Apple authentication failed: {str(e)}"
         )
 
 
-@router.get("/verify", response_model=StandardResponse)
-async def verify_token(current_user: UserInDB = Depends(AuthHandler.get_current_user)):
+@router.post(
+    "/introspect/batch",
+    response_model=StandardResponse,
+    dependencies=[Depends(AuthHandler.require_introspection_client)]
+)
+async def introspect_tokens(introspection_request: BatchIntrospectionRequest):
+    """
+    Introspect a batch of tokens for an API gateway.
+    Returns one RFC 7662 style result per token, in request order.
+    """
+    try:
+        results = await introspection_service.introspect_tokens(introspection_request.tokens)
+        return standard_response(
+            status=True,
+            data=results,
+            message="Tokens introspected successfully"
+        )
+    except HTTPException:
+        # An oversized batch is the client's error, reported with its status code
+        raise
+    except Exception as e:
+        return standard_response(
+            status=False,
+            message=f"Token introspection failed: {str(e)}"
+        )
+
+
+@router.get("/verify", response_model=StandardResponse, responses={304: {"description": "Not Modified"}})
+async def verify_token(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(AuthHandler.get_current_principal)
+):
     """
     Verify the access token and return user details.
     This endpoint requires a valid Bearer token in the Authorization header.
+    Send the previous ETag in If-None-Match to get a 304 when nothing changed.
     """
+    etag = user_etag("verify", current_user.id, current_user.updated_at, current_user.last_login)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     try:
-        # Convert the UserInDB model to UserVerificationResponse
+        # Convert the Principal to UserVerificationResponse
         user_data = UserVerificationResponse(
-            id=str(current_user.id),
+            id=current_user.id,
             email=current_user.email,
             full_name=current_user.full_name,
             phone_number=current_user.phone_number,
@@ -109,13 +150,15 @@ async def verify_token(current_user: UserInDB = Depends(AuthHandler.get_current_
             last_login=current_user.last_login
         )
         
-        return StandardResponse(
+        set_cache_headers(response, etag)
+        return standard_response(
             status=True,
-            data=user_data.model_dump(),
-            message="Token verified successfully"
+            data=user_data,
+            message="Token verified successfully",
+            response=response
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Token verification failed: {str(e)}"
         )
\ No newline at end of file
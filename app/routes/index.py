@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.routes import auth, users
+from app.routes import admin, auth, users
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,4 +19,5 @@ def health_check():
         return {"status": "error", "message": "Service is not available"}
 
 router.include_router(auth.router, prefix="/auth", tags=["authentication"])
-router.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
+router.include_router(users.router, prefix="/users", tags=["users"])
+router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,17 @@
+# routes/metrics.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint; merges every worker's metrics when METRICS_MULTIPROC_DIR is set.
+    Async so rendering runs on the event loop, which is the only writer of the registry.
+    """
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,25 +1,41 @@
 # routes/user.py
-from fastapi import APIRouter, Depends
-from app.models.user import UserInDB, UserUpdate
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.core.config import settings
+from app.core.etag import etag_matches, not_modified, set_cache_headers, user_etag
+from app.models.principal import Principal
+from app.models.user import AuthProvider, UserInDB, UserUpdate
 from app.core.auth import AuthHandler
 from app.services.user_service import UserService
+from app.core.responses import standard_response
 from app.schema.auth import StandardResponse
 
 router = APIRouter()
 user_service = UserService()
 
-@router.get("/me", response_model=StandardResponse)
-async def get_current_user(current_user: UserInDB = Depends(AuthHandler.get_current_user)):
-    """Get current user profile."""
+@router.get("/me", response_model=StandardResponse, responses={304: {"description": "Not Modified"}})
+async def get_current_user(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(AuthHandler.get_current_user)
+):
+    """Get current user profile. Honors If-None-Match with the ETag of the previous response."""
+    etag = user_etag("profile", current_user.id, current_user.updated_at, current_user.last_login)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     try:
-        user = await user_service.get_user_by_id(str(current_user.id))
-        return StandardResponse(
+        user = await user_service.get_user_by_id(current_user.id)
+        set_cache_headers(response, etag)
+        return standard_response(
             status=True,
             data=user,
-            message="User profile retrieved successfully"
+            message="User profile retrieved successfully",
+            response=response
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Failed to retrieve user profile: {str(e)}"
         )
@@ -27,21 +43,67 @@ async def get_current_user(current_user: UserInDB = Depends(AuthHandler.get_curr
 @router.put("/me", response_model=StandardResponse)
 async def update_user(
     user_update: UserUpdate,
-    current_user: UserInDB = Depends(AuthHandler.get_current_user)
+    current_user: Principal = Depends(AuthHandler.get_current_principal)
 ):
     """Update current user profile."""
     try:
         updated_user = await user_service.update_user(
-            str(current_user.id),
+            current_user.id,
             user_update
         )
-        return StandardResponse(
+        return standard_response(
             status=True,
             data=updated_user,
             message="User profile updated successfully"
         )
     except Exception as e:
-        return StandardResponse(
+        return standard_response(
             status=False,
             message=f"Failed to update user profile: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("", response_model=StandardResponse, dependencies=[Depends(AuthHandler.require_admin)])
+async def list_users(
+    auth_provider: Optional[AuthProvider] = None,
+    is_verified: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = Query(None, min_length=1, description="Case-sensitive prefix of search_field"),
+    search_field: Literal["email", "full_name"] = "email",
+    email: Optional[str] = Query(None, description="Exact email, compared case-insensitively"),
+    view: Literal["summary", "full"] = "summary",
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.USER_LIST_MAX_LIMIT),
+    include_total: bool = False
+):
+    """
+    List users for support staff (admin API key required), paginated by cursor:
+    newest first, or ordered by search_field when searching.
+    """
+    try:
+        page = await user_service.list_users(
+            auth_provider=auth_provider.value if auth_provider else None,
+            is_verified=is_verified,
+            created_after=created_after,
+            created_before=created_before,
+            search=search,
+            search_field=search_field,
+            email=email,
+            view=view,
+            cursor=cursor,
+            limit=limit,
+            include_total=include_total
+        )
+        return standard_response(
+            status=True,
+            data=page,
+            message="Users retrieved successfully"
+        )
+    except HTTPException:
+        # A malformed cursor is the client's error, reported with its status code
+        raise
+    except Exception as e:
+        return standard_response(
+            status=False,
+            message=f"Failed to list users: {str(e)}"
+        )
@@ -0,0 +1,16 @@
+# routes/well_known.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.keys import keyring
+
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+def jwks():
+    """Public keys for verifying access tokens without calling /auth/verify."""
+    return JSONResponse(
+        keyring.jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"}
+    )
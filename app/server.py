@@ -0,0 +1,130 @@
+# server.py
+"""
+Production entry point: python -m app.server
+
+Runs app.main:app under uvicorn with one worker process per available CPU,
+uvloop and httptools when installed, and workers recycled after
+SERVER_MAX_REQUESTS (plus a random jitter so they do not all restart at once).
+On SIGTERM each worker stops accepting connections, waits up to
+SERVER_GRACEFUL_TIMEOUT_SECONDS for in-flight requests, then runs the app's
+lifespan shutdown, which flushes buffered writes before closing the database.
+"""
+import argparse
+import atexit
+import importlib.util
+import logging
+import math
+import os
+import random
+import shutil
+import tempfile
+from typing import Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring CPU affinity and a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server whose request limit is drawn per worker, so recycling is staggered."""
+
+    def __init__(self, config: uvicorn.Config, max_requests: Optional[int] = None, max_requests_jitter: int = 0):
+        super().__init__(config)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+
+    async def serve(self, sockets=None):
+        if self.max_requests:
+            # SystemRandom, because forked workers would share the parent's random state
+            jitter = random.SystemRandom().randint(0, self.max_requests_jitter) if self.max_requests_jitter else 0
+            self.config.limit_max_requests = self.max_requests + jitter
+        await super().serve(sockets)
+
+
+def _configure(name: str, value):
+    # The environment reaches spawned workers; with a single worker the app is
+    # imported in this process, whose settings are already loaded
+    os.environ[name] = str(value)
+    setattr(settings, name, value)
+
+
+def _configure_workers(workers: int, cpus: int):
+    """Settings the worker processes derive from the worker count."""
+    # Each worker has its own hashing pool; together they should not exceed the CPUs
+    if settings.PASSWORD_HASH_WORKERS is None:
+        _configure("PASSWORD_HASH_WORKERS", max(1, cpus // workers))
+    if workers > 1 and settings.METRICS_ENABLED and not settings.METRICS_MULTIPROC_DIR:
+        directory = tempfile.mkdtemp(prefix="fastapi-auth-metrics-")
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        _configure("METRICS_MULTIPROC_DIR", directory)
+
+
+def build_config(workers: int, host: str, port: int) -> uvicorn.Config:
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    config = uvicorn.Config(
+        "app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        access_log=settings.SERVER_ACCESS_LOG,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+    )
+    # Logged after Config, which sets up uvicorn's logging
+    logger.info(f"Starting {workers} worker(s) on {host}:{port} with {loop} and {http}")
+    return config
+
+
+def run(workers: Optional[int] = None, host: Optional[str] = None, port: Optional[int] = None):
+    cpus = available_cpus()
+    workers = workers or settings.SERVER_WORKERS or cpus
+    _configure_workers(workers, cpus)
+
+    config = build_config(workers, host or settings.SERVER_HOST, port or settings.SERVER_PORT)
+    server = WorkerServer(config, settings.SERVER_MAX_REQUESTS, settings.SERVER_MAX_REQUESTS_JITTER)
+
+    if workers == 1:
+        server.run()
+        return
+    # The supervisor restarts any worker that exits, including ones recycled after max requests
+    sock = config.bind_socket()
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with production server settings.")
+    parser.add_argument("--workers", type=int, help="worker processes (default: SERVER_WORKERS or the CPU count)")
+    parser.add_argument("--host", help="bind address (default: SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="bind port (default: SERVER_PORT)")
+    args = parser.parse_args()
+    run(args.workers, args.host, args.port)
@@ -1,15 +1,25 @@
 # auth_service.py
+import logging
 from datetime import datetime, timedelta
+from bson import ObjectId
 from fastapi import HTTPException, status
-from jose import jwt, JWTError
+from jose import JWTError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.models.user import UserCreate, Token, UserInDB, AuthProvider
 from app.models.auth import GoogleAuthRequest, AppleAuthRequest
 from app.core.auth import AuthHandler
 from app.core.config import settings as config_settings
+from app.core.metrics import stage
+from app.core.tokens import token_engine
+from app.core.user_cache import user_cache
 from app.db.config import Database
+from app.db.write_behind import login_stamps
 from app.services.social_auth import SocialAuth
 
+logger = logging.getLogger(__name__)
+
 class AuthService:
     def __init__(self):
         self.db = None
@@ -23,21 +33,29 @@ class AuthService:
         """Register a new user with email and password."""
         db = await self._get_db()
         
-        if await db.users.find_one({"email": user.email}):
+        # An indexed lookup is far cheaper than the password hash a duplicate would waste
+        if await db.users.find_one({"email": user.email}, {"_id": 1}):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
         user_dict = user.model_dump()
-        user_dict["hashed_password"] = AuthHandler.get_password_hash(user_dict.pop("password"))
+        user_dict["hashed_password"] = await AuthHandler.get_password_hash_async(user_dict.pop("password"))
         current_time = datetime.utcnow()
         user_dict.update({
             "created_at": current_time,
             "updated_at": current_time
         })
         
-        result = await db.users.insert_one(user_dict)
+        # The unique email index still rejects a concurrent registration of the same email
+        try:
+            result = await db.users.insert_one(user_dict)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
         user_dict["_id"] = str(result.inserted_id)
         
         return self._create_tokens(str(user_dict["_id"]))
@@ -47,27 +65,27 @@ class AuthService:
         db = await self._get_db()
         user = await db.users.find_one({"email": email})
         
-        if not user or not AuthHandler.verify_password(password, user["hashed_password"]):
+        valid, new_hash = False, None
+        if user and user.get("hashed_password"):
+            valid, new_hash = await AuthHandler.verify_and_update_password_async(password, user["hashed_password"])
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
             )
         
-        await db.users.update_one(
-            {"_id": user["_id"]},
-            {"$set": {"last_login": datetime.utcnow()}}
-        )
+        if new_hash and config_settings.PASSWORD_REHASH_ON_LOGIN:
+            await self._rehash_password(db, user["_id"], user["hashed_password"], new_hash)
+        
+        await self._stamp_login(db, str(user["_id"]), {"last_login": datetime.utcnow()})
         
         return self._create_tokens(str(user["_id"]))
     
     def refresh_user_token(self, refresh_token: str) -> Token:
         """Generate new access and refresh tokens using a valid refresh token."""
         try:
-            payload = jwt.decode(
-                refresh_token,
-                config_settings.JWT_SECRET_KEY,
-                algorithms=[config_settings.JWT_ALGORITHM]
-            )
+            with stage("jwt_decode"):
+                payload = token_engine.decode(refresh_token)
             
             if not payload.get("refresh"):
                 raise HTTPException(
@@ -85,7 +103,8 @@ class AuthService:
     
     async def authenticate_with_google(self, auth_request: GoogleAuthRequest) -> Token:
         """Handle Google Sign-In authentication."""
-        token_data = SocialAuth.verify_google_token(auth_request.id_token)
+        id_token = await SocialAuth.exchange_google_code(auth_request.code)
+        token_data = await SocialAuth.verify_google_token(id_token)
         
         user_info = {
             "email": token_data["email"],
@@ -98,7 +117,7 @@ class AuthService:
 
     async def authenticate_with_apple(self, auth_request: AppleAuthRequest) -> Token:
         """Handle Apple Sign-In authentication."""
-        token_data = SocialAuth.verify_apple_token(auth_request.id_token)
+        token_data = await SocialAuth.verify_apple_token(auth_request.id_token)
         
         # Extract user info from Apple ID token
         user_info = {
@@ -113,44 +132,73 @@ class AuthService:
     async def _handle_social_auth(self, user_info: dict, provider: AuthProvider) -> Token:
         """Common handler for social authentication."""
         db = await self._get_db()
-        user = await db.users.find_one({
-            "email": user_info["email"],
-            "auth_provider": provider
-        })
-        
         current_time = datetime.utcnow()
         
-        if not user:
-            user_info.update({
-                "is_active": True,
-                "is_verified": True,
-                "auth_provider": provider,
-                "created_at": current_time,
-                "updated_at": current_time,
-                "last_login": current_time
-            })
-            
-            result = await db.users.insert_one(user_info)
-            user_id = str(result.inserted_id)
-        else:
-            update_data = {
-                "last_login": current_time,
-                "updated_at": current_time
-            }
-            
-            # Only update these fields if they exist in user_info
-            if user_info.get("full_name"):
-                update_data["full_name"] = user_info["full_name"]
-            if user_info.get("profile_picture"):
-                update_data["profile_picture"] = user_info["profile_picture"]
-                
+        update_data = {
+            "last_login": current_time,
+            "updated_at": current_time
+        }
+        insert_data = {
+            "provider_user_id": user_info["provider_user_id"],
+            "is_active": True,
+            "is_verified": True,
+            "created_at": current_time
+        }
+        
+        # Only overwrite these fields when the provider supplied them
+        for field in ("full_name", "profile_picture"):
+            if user_info.get(field):
+                update_data[field] = user_info[field]
+            else:
+                insert_data[field] = user_info.get(field)
+        
+        # One round trip creates or updates the user. A concurrent first login
+        # loses the insert race on the unique email index; retrying then matches
+        # the winner's document. A second conflict means the email belongs to
+        # an account with another provider.
+        for attempt in range(2):
+            try:
+                user = await db.users.find_one_and_update(
+                    {"email": user_info["email"], "auth_provider": provider},
+                    {"$set": update_data, "$setOnInsert": insert_data},
+                    projection={"_id": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                if attempt:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Email already registered with a different sign-in method"
+                    )
+        
+        user_id = str(user["_id"])
+        await user_cache.invalidate(user_id)
+        return self._create_tokens(user_id)
+    
+    async def _rehash_password(self, db, user_id, old_hash: str, new_hash: str):
+        """Store a hash made under the current policy, unless the password changed meanwhile."""
+        try:
             await db.users.update_one(
-                {"_id": user["_id"]},
-                {"$set": update_data}
+                {"_id": user_id, "hashed_password": old_hash},
+                {"$set": {"hashed_password": new_hash}}
             )
-            user_id = str(user["_id"])
+        except Exception as e:
+            # The old hash still verifies, so the next login simply tries again
+            logger.warning(f"Could not store rehashed password for user {user_id}: {e}")
+
+    async def _stamp_login(self, db, user_id: str, stamps: dict):
+        """Record login timestamps, batched unless write-behind is disabled."""
+        if config_settings.LOGIN_STAMP_WRITE_BEHIND:
+            await login_stamps.record(user_id, stamps)
+            return
         
-        return self._create_tokens(user_id)
+        await db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": stamps}
+        )
+        await user_cache.invalidate(user_id)
     
     def _create_tokens(self, user_id: str) -> Token:
         """Create access and refresh tokens for a user."""
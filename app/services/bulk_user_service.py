@@ -0,0 +1,393 @@
+# services/bulk_user_service.py
+"""
+Bulk user import and export.
+
+Imports stream NDJSON or CSV, validate every row with the UserCreate rules,
+hash passwords on a process pool and insert each chunk with one unordered
+bulk_write, so duplicates and bad rows are reported per row without stopping
+the rest. Exports stream from a server-side cursor whose inclusion projection
+can never return password hashes.
+
+Usage:
+    python -m app.services.bulk_user_service import users.csv
+    python -m app.services.bulk_user_service export --format csv --output users.csv
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.config import settings
+from app.core.hashing import hash_many
+from app.db.config import Database
+from app.models.user import UserCreate
+
+FORMATS = ("ndjson", "csv")
+
+# Only these fields are read from the database; hashed_password is never among them
+EXPORT_FIELDS = (
+    "email", "full_name", "phone_number", "auth_provider", "provider_user_id",
+    "is_active", "is_verified", "created_at", "updated_at", "last_login",
+)
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+EXPORT_COLUMNS = ("id",) + EXPORT_FIELDS
+
+DUPLICATE_KEY = 11000
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into lines, holding at most one partial line in memory.
+    A line longer than max_line_bytes is discarded as it arrives and yielded as None.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield None if oversized or len(line) > max_line_bytes else line
+            oversized = False
+        if len(buffer) > max_line_bytes:
+            oversized, buffer = True, b""
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer
+
+
+def _decode(line: Optional[bytes], first: bool, max_line_bytes: int) -> Tuple[Optional[str], Optional[str]]:
+    """Return (text, None), or (None, error) for a line that cannot be read."""
+    if line is None:
+        return None, f"Line exceeds {max_line_bytes} bytes"
+    if first and line.startswith(codecs.BOM_UTF8):
+        line = line[len(codecs.BOM_UTF8):]
+    try:
+        text = line.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return None, f"Invalid UTF-8: {e.reason} at byte {e.start}"
+    return (text[:-1] if text.endswith("\r") else text), None
+
+
+async def iter_rows(
+    lines: AsyncIterator[Optional[bytes]],
+    fmt: str,
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Yield (row number, row, error) for every record; rows are numbered from 1, excluding
+    any header. Records that cannot be decoded or parsed are yielded with an error.
+    """
+    row_number = 0
+    first = True
+    if fmt == "ndjson":
+        async for raw in lines:
+            line, error = _decode(raw, first, max_line_bytes)
+            first = False
+            if error is None and not line.strip():
+                continue
+            row_number += 1
+            if error is not None:
+                yield row_number, None, error
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, row, None
+        return
+
+    header = None
+    record = ""
+    async for raw in lines:
+        line, error = _decode(raw, first, max_line_bytes)
+        first = False
+        if error is None:
+            record = f"{record}\n{line}" if record else line
+            if len(record) > max_line_bytes:
+                error = f"Record exceeds {max_line_bytes} bytes; is a quote unterminated?"
+            elif record.count('"') % 2:
+                # A quoted field continues on the next line
+                continue
+        if error is None:
+            try:
+                values = next(csv.reader([record]), [])
+            except csv.Error as e:
+                error = f"Invalid CSV: {e}"
+        record = ""
+
+        if header is None:
+            if error is not None:
+                # Without a header no row can be read
+                yield 0, None, f"Invalid header: {error}"
+                return
+            if values:
+                header = [name.strip() for name in values]
+            continue
+        if error is None and not values:
+            continue
+        row_number += 1
+        if error is not None:
+            yield row_number, None, error
+            continue
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells mean "not provided", so optional fields fall back to their defaults
+        yield row_number, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record:
+        yield row_number + 1, None, "Unterminated quoted field"
+
+
+async def read_file(path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    source = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+class ImportReport:
+    def __init__(self, max_errors: Optional[int] = None):
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.errors_truncated = False
+
+    def error(self, row: int, email: Optional[str], reason: str, detail: str):
+        if reason == "invalid":
+            self.invalid += 1
+        elif reason == "duplicate":
+            self.duplicates += 1
+        else:
+            self.failed += 1
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            self.errors_truncated = True
+            return
+        self.errors.append({"row": row, "email": email, "reason": reason, "detail": detail})
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+class BulkUserService:
+    def __init__(self):
+        self.db = None
+
+    async def _get_db(self):
+        if self.db is None:
+            self.db = await Database.get_db()
+        return self.db
+
+    async def import_users(
+        self,
+        chunks: AsyncIterator[bytes],
+        fmt: str,
+        max_errors: Optional[int] = None,
+    ) -> ImportReport:
+        """Create a local account for every valid row; the unique email index decides duplicates."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown import format: {fmt}")
+        db = await self._get_db()
+        report = ImportReport(max_errors)
+        workers = settings.BULK_IMPORT_HASH_WORKERS or os.cpu_count() or 1
+        max_line_bytes = settings.BULK_IMPORT_MAX_LINE_BYTES
+        chunk: List[Tuple[int, UserCreate]] = []
+        write: Optional[asyncio.Future] = None
+
+        # Spawned, not forked: forking a process that runs the driver's threads is unsafe
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            try:
+                rows = iter_rows(iter_lines(chunks, max_line_bytes), fmt, max_line_bytes)
+                async for row_number, row, error in rows:
+                    report.received += 1
+                    if error is not None:
+                        report.error(row_number, None, "invalid", error)
+                        continue
+                    try:
+                        chunk.append((row_number, UserCreate(**row)))
+                    except ValidationError as e:
+                        report.error(row_number, row.get("email"), "invalid", _describe(e))
+                        continue
+
+                    if len(chunk) >= settings.BULK_IMPORT_CHUNK_SIZE:
+                        documents = await self._prepare(pool, workers, chunk)
+                        chunk = []
+                        # Hashing the next chunk overlaps with writing this one
+                        if write is not None:
+                            await write
+                        write = asyncio.ensure_future(self._write(db, documents, report))
+
+                if chunk:
+                    documents = await self._prepare(pool, workers, chunk)
+                    if write is not None:
+                        await write
+                    write = asyncio.ensure_future(self._write(db, documents, report))
+            finally:
+                if write is not None:
+                    await write
+        finally:
+            # Shutting down joins the worker processes; keep that off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+        return report
+
+    async def _prepare(self, pool: ProcessPoolExecutor, workers: int, chunk: List[Tuple[int, UserCreate]]) -> list:
+        """Hash a chunk's passwords across the pool and build its documents in row order."""
+        loop = asyncio.get_running_loop()
+        size = -(-len(chunk) // workers)
+        slices = [chunk[i:i + size] for i in range(0, len(chunk), size)]
+        hashed = await asyncio.gather(*(
+            loop.run_in_executor(pool, hash_many, [user.password for _, user in part]) for part in slices
+        ))
+
+        current_time = datetime.utcnow()
+        documents = []
+        for (row_number, user), hashed_password in zip(chunk, (h for part in hashed for h in part)):
+            document = user.model_dump()
+            document.pop("password")
+            document.update({
+                "hashed_password": hashed_password,
+                "created_at": current_time,
+                "updated_at": current_time,
+            })
+            documents.append((row_number, document))
+        return documents
+
+    async def _write(self, db, documents: list, report: ImportReport):
+        try:
+            result = await db.users.bulk_write(
+                [InsertOne(document) for _, document in documents],
+                ordered=False
+            )
+            report.inserted += result.inserted_count
+        except BulkWriteError as e:
+            report.inserted += e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                row_number, document = documents[write_error["index"]]
+                if write_error.get("code") == DUPLICATE_KEY:
+                    report.error(row_number, document["email"], "duplicate", "Email already registered")
+                else:
+                    report.error(row_number, document["email"], "failed", write_error.get("errmsg", "Write failed"))
+        except PyMongoError as e:
+            for row_number, document in documents:
+                report.error(row_number, document["email"], "failed", str(e))
+
+    async def export_users(self, fmt: str, auth_provider: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream users in _id order as NDJSON or CSV, a batch of lines per chunk."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        db = await self._get_db()
+        query = {"auth_provider": auth_provider} if auth_provider else {}
+        cursor = db.users.find(
+            query,
+            EXPORT_PROJECTION,
+            batch_size=settings.BULK_EXPORT_BATCH_SIZE
+        ).sort("_id", 1)
+
+        lines = [_csv_line(EXPORT_COLUMNS)] if fmt == "csv" else []
+        async for user in cursor:
+            row = {"id": str(user["_id"]), **{field: user.get(field) for field in EXPORT_FIELDS}}
+            if fmt == "csv":
+                lines.append(_csv_line(_csv_value(row[column]) for column in EXPORT_COLUMNS))
+            else:
+                lines.append(json.dumps(row, default=_json_value) + "\n")
+            if len(lines) >= settings.BULK_EXPORT_BATCH_SIZE:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value.value if hasattr(value, "value") else value)
+
+
+def _csv_line(values) -> str:
+    output = io.StringIO()
+    csv.writer(output, lineterminator="\n").writerow(values)
+    return output.getvalue()
+
+
+bulk_user_service = BulkUserService()
+
+
+async def main(args) -> int:
+    try:
+        if args.command == "import":
+            fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+            report = await bulk_user_service.import_users(read_file(args.path), fmt)
+            for error in report.errors:
+                print(json.dumps(error), file=sys.stderr)
+            summary = {key: value for key, value in report.to_dict().items() if key != "errors"}
+            print(json.dumps(summary))
+            return 1 if report.failed else 0
+
+        output = open(args.output, "w", newline="") if args.output else sys.stdout
+        try:
+            async for chunk in bulk_user_service.export_users(args.format or "ndjson", args.auth_provider):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return 0
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import or export users.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="create users from NDJSON or CSV; errors go to stderr")
+    import_parser.add_argument("path", help="file to read, or - for stdin")
+    import_parser.add_argument("--format", choices=FORMATS, help="default: csv for .csv files, else ndjson")
+    export_parser = commands.add_parser("export", help="write users without password hashes")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--auth-provider", help="only export users of this provider")
+    export_parser.add_argument("--output", help="file to write instead of stdout")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,209 @@
+# services/http_client.py
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+# httpx is imported on first use; it is one of the slowest imports of the app
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after a cooldown."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def record_abandoned(self):
+        """A call cancelled before it had an outcome; only a probe needs settling."""
+        if self._probing:
+            self.record_failure()
+
+
+class ProviderClient:
+    """Timeouts, retry policy, breaker and counters for one outbound provider."""
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float):
+        import httpx
+
+        self.name = name
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.breaker = CircuitBreaker(
+            settings.OUTBOUND_HTTP_BREAKER_THRESHOLD,
+            settings.OUTBOUND_HTTP_BREAKER_RESET_SECONDS,
+        )
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "avg_latency_ms": (self.total_latency / self.requests * 1000) if self.requests else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+
+class OutboundHTTP:
+    """Application-lifetime httpx client shared by all outbound provider calls."""
+
+    def __init__(self):
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._providers: Dict[str, ProviderClient] = {}
+
+    async def start(self):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OUTBOUND_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OUTBOUND_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.OUTBOUND_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def provider(self, name: str) -> ProviderClient:
+        client = self._providers.get(name)
+        if client is None:
+            config = settings.OUTBOUND_HTTP_PROVIDERS.get(name, {})
+            client = ProviderClient(
+                name,
+                connect_timeout=config.get("connect_timeout", settings.OUTBOUND_HTTP_CONNECT_TIMEOUT),
+                read_timeout=config.get("read_timeout", settings.OUTBOUND_HTTP_READ_TIMEOUT),
+            )
+            self._providers[name] = client
+        return client
+
+    async def request(self, provider: str, method: str, url: str, **kwargs) -> "httpx.Response":
+        """
+        Send a request to a provider.
+        Idempotent requests are retried on transport errors and retryable statuses;
+        other methods are only retried when the connection was never established.
+        """
+        import httpx
+
+        if self._client is None:
+            await self.start()
+
+        target = self.provider(provider)
+        if not target.breaker.allow():
+            target.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{provider} is temporarily unavailable"
+            )
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    response = await self._client.request(method, url, timeout=target.timeout, **kwargs)
+                    failed = response.status_code >= 500
+                    retryable = idempotent and response.status_code in RETRYABLE_STATUS
+                    error = None
+                except httpx.TransportError as e:
+                    response = None
+                    failed = True
+                    retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                    error = e
+
+                elapsed = time.monotonic() - started
+                target.requests += 1
+                target.total_latency += elapsed
+                target.max_latency = max(target.max_latency, elapsed)
+
+                if not failed and not retryable:
+                    settled = True
+                    target.breaker.record_success()
+                    return response
+
+                target.errors += 1
+                if not retryable or attempt >= settings.OUTBOUND_HTTP_MAX_RETRIES:
+                    settled = True
+                    target.breaker.record_failure()
+                    if error is not None:
+                        logger.warning(f"Request to {provider} failed: {error}")
+                        raise HTTPException(
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"{provider} is temporarily unavailable"
+                        )
+                    return response
+
+                attempt += 1
+                target.retries += 1
+                # Full jitter keeps retries from concurrent requests from synchronising
+                await asyncio.sleep(random.uniform(0, settings.OUTBOUND_HTTP_RETRY_BACKOFF * 2 ** attempt))
+        except asyncio.CancelledError:
+            if not settled:
+                target.breaker.record_abandoned()
+            raise
+        except Exception:
+            # Decoding, redirect and URL errors must not leave a half-open probe in flight
+            if not settled:
+                target.breaker.record_failure()
+            raise
+
+    def stats(self) -> dict:
+        return {name: client.stats() for name, client in self._providers.items()}
+
+
+http_client = OutboundHTTP()
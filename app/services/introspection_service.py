@@ -0,0 +1,84 @@
+# services/introspection_service.py
+from typing import List
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from jose import JWTError
+
+from app.core.auth import AuthHandler
+from app.core.config import settings
+from app.core.user_cache import MISSING, user_cache
+from app.db.config import Database
+from app.models.principal import PRINCIPAL_PROJECTION
+
+INACTIVE = {"active": False}
+
+
+class IntrospectionService:
+    def __init__(self):
+        self.db = None
+    
+    async def _get_db(self):
+        if self.db is None:
+            self.db = await Database.get_db()
+        return self.db
+    
+    async def introspect_tokens(self, tokens: List[str]) -> List[dict]:
+        """
+        Introspect many tokens at once, in the style of RFC 7662.
+        Tokens are decoded in one pass and every referenced user not already
+        cached is fetched with a single $in query.
+        """
+        if len(tokens) > settings.INTROSPECTION_MAX_TOKENS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.INTROSPECTION_MAX_TOKENS} tokens per request"
+            )
+        
+        payloads = []
+        for token in tokens:
+            try:
+                if len(token) > settings.INTROSPECTION_MAX_TOKEN_LENGTH:
+                    raise JWTError("Token too long")
+                payload = AuthHandler.decode_token(token)
+                if not ObjectId.is_valid(payload.get("sub")):
+                    raise JWTError("Invalid subject")
+            except JWTError:
+                payload = None
+            payloads.append(payload)
+        
+        users = {}
+        missing = []
+        for user_id in {payload["sub"] for payload in payloads if payload}:
+            user = await user_cache.get(user_id)
+            if user is MISSING:
+                missing.append(user_id)
+            else:
+                users[user_id] = user
+        
+        if missing:
+            db = await self._get_db()
+            async for user in db.users.find(
+                {"_id": {"$in": [ObjectId(user_id) for user_id in missing]}},
+                PRINCIPAL_PROJECTION
+            ):
+                user["_id"] = str(user["_id"])
+                users[user["_id"]] = user
+            for user_id in missing:
+                await user_cache.set(user_id, users.get(user_id))
+        
+        results = []
+        for payload in payloads:
+            user = users.get(payload["sub"]) if payload else None
+            if user is None or not user.get("is_active", True):
+                results.append(INACTIVE)
+                continue
+            results.append({
+                "active": True,
+                "sub": payload["sub"],
+                "exp": payload.get("exp"),
+                "token_type": "refresh_token" if payload.get("refresh") else "access_token",
+                "username": user["email"],
+                "email_verified": user.get("is_verified", False),
+            })
+        return results
@@ -0,0 +1,117 @@
+# services/jwks.py
+import asyncio
+import logging
+import re
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.services.http_client import http_client
+
+if TYPE_CHECKING:
+    from jose.backends.base import Key
+
+logger = logging.getLogger(__name__)
+
+# A key source returns the JWK Set document and its Cache-Control max-age, if any
+KeySource = Callable[[str], Awaitable[Tuple[dict, Optional[int]]]]
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    if not cache_control:
+        return None
+    match = _MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+async def fetch_jwks(url: str, provider: str = "default") -> Tuple[dict, Optional[int]]:
+    """Default key source: download the key set through the shared HTTP client."""
+    response = await http_client.request(provider, "GET", url)
+    response.raise_for_status()
+    return response.json(), parse_max_age(response.headers.get("Cache-Control"))
+
+
+class JWKSCache:
+    """
+    Identity-provider signing keys, indexed by kid and parsed once per fetch.
+    Keys are served fresh until max-age, then served stale while a background
+    refresh runs. An unknown kid triggers at most one refetch per
+    min_refresh_interval so forged kids cannot hammer the provider.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        provider: str = "default",
+        source: Optional[KeySource] = None,
+        default_max_age: int = 3600,
+        stale_while_revalidate: int = 86400,
+        min_refresh_interval: int = 60,
+    ):
+        self.url = url
+        self.source = source or partial(fetch_jwks, provider=provider)
+        self.default_max_age = default_max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.min_refresh_interval = min_refresh_interval
+
+        self._keys: Dict[str, "Key"] = {}
+        self._fresh_until = 0.0
+        self._stale_until = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: str) -> "Key":
+        now = time.monotonic()
+        if now >= self._stale_until:
+            await self.refresh()
+        elif now >= self._fresh_until:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= self.min_refresh_interval:
+            # The provider may have rotated keys since our last fetch
+            await self.refresh()
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise HTTPException(status_code=401, detail="Unknown token signing key")
+        return key
+
+    async def refresh(self):
+        fetched_at = self._fetched_at
+        async with self._lock:
+            if self._fetched_at != fetched_at:
+                # Another coroutine refreshed while we waited for the lock
+                return
+
+            from jose import jwk
+
+            document, max_age = await self.source(self.url)
+            keys = {}
+            for key_data in document.get("keys", []):
+                try:
+                    keys[key_data["kid"]] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+                except Exception as e:
+                    logger.warning(f"Skipping unusable key from {self.url}: {e}")
+
+            now = time.monotonic()
+            max_age = self.default_max_age if max_age is None else max_age
+            self._keys = keys
+            self._fetched_at = now
+            self._fresh_until = now + max_age
+            self._stale_until = self._fresh_until + self.stale_while_revalidate
+
+    def _refresh_in_background(self):
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.url} failed, serving stale keys: {e}")
@@ -1,41 +1,74 @@
 from fastapi import HTTPException
-import requests
 from app.core.config import settings
-from jose import jwt
+from app.core.metrics import timed_stage
+from app.services.http_client import http_client
+from app.services.jwks import JWKSCache
+from jose import JWTError
 
 GOOGLE_CLIENT_ID = settings.GOOGLE_CLIENT_ID
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+APPLE_ISSUER = "https://appleid.apple.com"
+
+google_keys = JWKSCache("https://www.googleapis.com/oauth2/v3/certs", provider="google")
+apple_keys = JWKSCache("https://appleid.apple.com/auth/keys", provider="apple")
+
+
+async def _verify_id_token(id_token: str, keys: JWKSCache, audience: str, issuer) -> dict:
+    """Verify an OpenID Connect ID token against the provider's cached signing keys."""
+    from jose import jwt
+
+    try:
+        header = jwt.get_unverified_header(id_token)
+        key = await keys.get_key(header.get("kid"))
+        return jwt.decode(
+            id_token,
+            key,
+            algorithms=["RS256"],
+            audience=audience,
+            issuer=issuer,
+            options={"verify_at_hash": False}
+        )
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
 
 class SocialAuth:
     @staticmethod
-    def verify_google_token(id_token: str):
+    @timed_stage("google_code_exchange")
+    async def exchange_google_code(code: str) -> str:
         """
-        Verify Google ID token using Google's token verification API.
+        Exchange a Google authorization code for the user's ID token.
         """
-        url = "https://oauth2.googleapis.com/tokeninfo"
-        response = requests.get(url, params={"id_token": id_token})
+        response = await http_client.request(
+            "google",
+            "POST",
+            settings.GOOGLE_OAUTH_ENDPOINTS["token_uri"],
+            data={
+                "code": code,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+                "grant_type": "authorization_code",
+            }
+        )
         
         if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid token")
+            raise HTTPException(status_code=401, detail="Invalid authorization code")
         
-        token_data = response.json()
-        
-        # Ensure the token was issued for your client
-        if token_data["aud"] != GOOGLE_CLIENT_ID:
-            raise HTTPException(status_code=401, detail="Token is not for this app")
-        
-        return token_data
+        id_token = response.json().get("id_token")
+        if not id_token:
+            raise HTTPException(status_code=401, detail="Google did not return an ID token")
+        return id_token
 
     @staticmethod
-    def verify_apple_token(id_token: str):
-        # Get Apple's public keys
-        response = requests.get("https://appleid.apple.com/auth/keys")
-        apple_public_keys = response.json()["keys"]
+    @timed_stage("google_token_verify")
+    async def verify_google_token(id_token: str):
+        """
+        Verify Google ID token locally against Google's published signing keys.
+        """
+        return await _verify_id_token(id_token, google_keys, GOOGLE_CLIENT_ID, GOOGLE_ISSUERS)
 
-        # Decode and verify the ID Token
-        decoded_token = jwt.decode(
-            id_token,
-            apple_public_keys,
-            algorithms=["RS256"],
-            audience=settings.BUNDLE_ID_IOS  # Replace with your app's bundle ID
-        )
-        return decoded_token
\ No newline at end of file
+    @staticmethod
+    @timed_stage("apple_token_verify")
+    async def verify_apple_token(id_token: str):
+        return await _verify_id_token(id_token, apple_keys, settings.BUNDLE_ID_IOS, APPLE_ISSUER)
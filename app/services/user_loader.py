@@ -0,0 +1,141 @@
+# services/user_loader.py
+import asyncio
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from app.db.config import Database
+from app.models.principal import PRINCIPAL_PROJECTION
+
+# Projections a caller can ask for; "full" is a superset of "principal"
+VIEWS = {
+    "principal": PRINCIPAL_PROJECTION,
+    "full": {"hashed_password": 0},
+}
+
+_identity_map: ContextVar[Optional[Dict[Tuple[str, str], Optional[dict]]]] = ContextVar(
+    "user_identity_map", default=None
+)
+
+
+class IdentityMapMiddleware:
+    """Give every HTTP request its own user identity map."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _identity_map.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _identity_map.reset(token)
+
+
+class _Flight:
+    """One in-flight query; stale once a write to the user lands while it runs."""
+
+    __slots__ = ("task", "stale")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.stale = False
+
+
+def _copy(user: Optional[dict]) -> Optional[dict]:
+    # User documents are flat, so a shallow copy keeps callers from sharing state
+    return dict(user) if user is not None else None
+
+
+class UserLoader:
+    """
+    Loads user documents by id with two layers of deduplication:
+    a per-request identity map, and singleflight coalescing of concurrent
+    in-flight queries for the same id and view across requests.
+    Every caller gets its own copy of the document.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str], _Flight] = {}
+        self.loads = 0
+        self.identity_hits = 0
+        self.coalesced = 0
+        self.queries = 0
+
+    async def load(self, user_id: str, view: str = "full") -> Optional[dict]:
+        """Return the user document with _id as a string, or None if it does not exist."""
+        self.loads += 1
+        identity_map = _identity_map.get()
+        if identity_map is not None:
+            for candidate in (view, "full"):
+                if (user_id, candidate) in identity_map:
+                    self.identity_hits += 1
+                    return _copy(identity_map[(user_id, candidate)])
+
+        user = await self._load_shared((user_id, view))
+        if identity_map is not None:
+            identity_map[(user_id, view)] = _copy(user)
+        return user
+
+    def forget(self, user_id: str):
+        """
+        Drop the current request's copies of a user after writing to it, and detach
+        queries already in flight so no caller joins or caches their pre-write result.
+        """
+        identity_map = _identity_map.get()
+        for view in VIEWS:
+            if identity_map is not None:
+                identity_map.pop((user_id, view), None)
+            flight = self._in_flight.pop((user_id, view), None)
+            if flight is not None:
+                flight.stale = True
+
+    async def _load_shared(self, key: Tuple[str, str]) -> Optional[dict]:
+        flight = self._join(key)
+        user = await asyncio.shield(flight.task)
+        if flight.stale:
+            # A write landed while the query ran; read again rather than return what it replaced
+            flight = self._join(key)
+            user = await asyncio.shield(flight.task)
+        return _copy(user)
+
+    def _join(self, key: Tuple[str, str]) -> _Flight:
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight
+        # The query runs as its own task so a cancelled caller cannot cancel the others
+        flight = _Flight(asyncio.ensure_future(self._query(*key)))
+        self._in_flight[key] = flight
+        flight.task.add_done_callback(lambda _: self._release(key, flight))
+        return flight
+
+    def _release(self, key: Tuple[str, str], flight: _Flight):
+        # A stale flight may already have been replaced by a fresh one for the same key
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    async def _query(self, user_id: str, view: str) -> Optional[dict]:
+        self.queries += 1
+        # Always the primary: these back auth decisions and the caller's own profile,
+        # which must reflect the caller's writes (and match the ETag built from it)
+        db = await Database.get_db()
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, VIEWS[view])
+        if user is not None:
+            user["_id"] = str(user["_id"])
+        return user
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "identity_hits": self.identity_hits,
+            "coalesced": self.coalesced,
+            "queries": self.queries,
+            "coalescing_ratio": 1 - self.queries / self.loads if self.loads else 0.0,
+        }
+
+
+user_loader = UserLoader()
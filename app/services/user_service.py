@@ -1,10 +1,62 @@
 # services/user_service.py
+import base64
+import binascii
+import re
 from datetime import datetime
+from typing import Optional
+import bson
 from bson import ObjectId
+from bson.errors import BSONError
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.models.user import UserInDB, UserUpdate
+from app.core.config import settings
+from app.core.user_cache import user_cache
 from app.db.config import Database
+from app.db.indexes import EMAIL_COLLATION, LIST_ORDERS
+from app.services.user_loader import user_loader
+
+# Projections for the admin listing; neither ever returns password hashes
+LIST_VIEWS = {
+    "summary": {
+        "email": 1, "full_name": 1, "auth_provider": 1,
+        "is_active": 1, "is_verified": 1, "created_at": 1,
+    },
+    "full": {"hashed_password": 0},
+}
+
+
+def encode_cursor(order: str, user: dict) -> str:
+    """Opaque keyset cursor for the position just after this user in the given order."""
+    position = {"order": order, "values": [user[field] for field in LIST_ORDERS[order]]}
+    return base64.urlsafe_b64encode(bson.encode(position)).decode()
+
+
+def decode_cursor(order: str, cursor: str) -> list:
+    """The sort values a cursor points after; it must come from a listing in the same order."""
+    try:
+        position = bson.decode(base64.urlsafe_b64decode(cursor.encode()))
+    except (BSONError, binascii.Error, ValueError):
+        position = None
+    if not position or position.get("order") != order or len(position.get("values", [])) != len(LIST_ORDERS[order]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return position["values"]
+
+
+def after_position(order: str, values: list) -> dict:
+    """Filter for the documents that sort strictly after the given sort values."""
+    keys = list(LIST_ORDERS[order].items())
+    branches = []
+    for i, (field, direction) in enumerate(keys):
+        branch = {key: value for (key, _), value in zip(keys[:i], values[:i])}
+        branch[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {"$or": branches}
 
 class UserService:
     def __init__(self):
@@ -17,8 +69,7 @@ class UserService:
     
     async def get_user_by_id(self, user_id: str) -> UserInDB:
         """Retrieve user by ID."""
-        db = await self._get_db()
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await user_loader.load(user_id)
         
         if not user:
             raise HTTPException(
@@ -26,7 +77,6 @@ class UserService:
                 detail="User not found"
             )
         
-        user["_id"] = str(user["_id"])
         return UserInDB(**user)
     
     async def update_user(self, user_id: str, user_update: UserUpdate) -> UserInDB:
@@ -45,19 +95,123 @@ class UserService:
         # Add updated timestamp
         update_data["updated_at"] = datetime.utcnow()
         
-        # Perform update
+        # Update and fetch the new document in one round trip
+        try:
+            updated_user = await db.users.find_one_and_update(
+                {"_id": ObjectId(user_id)},
+                {"$set": update_data},
+                projection={"hashed_password": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        
+        if updated_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        await user_cache.invalidate(user_id)
+        user_loader.forget(user_id)
+        
+        updated_user["_id"] = str(updated_user["_id"])
+        return UserInDB(**updated_user)
+    
+    async def deactivate_user(self, user_id: str) -> None:
+        """Deactivate a user account."""
+        db = await self._get_db()
+        
         result = await db.users.update_one(
             {"_id": ObjectId(user_id)},
-            {"$set": update_data}
+            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
         )
         
-        if result.modified_count == 0:
+        if result.matched_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        # Fetch and return updated user
-        updated_user = await db.users.find_one({"_id": ObjectId(user_id)})
-        updated_user["_id"] = str(updated_user["_id"])
-        return UserInDB(**updated_user)
+        await user_cache.invalidate(user_id)
+        user_loader.forget(user_id)
+    
+    async def list_users(
+        self,
+        auth_provider: Optional[str] = None,
+        is_verified: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        search: Optional[str] = None,
+        search_field: str = "email",
+        email: Optional[str] = None,
+        view: str = "summary",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        include_total: bool = False,
+    ) -> dict:
+        """
+        List users one page at a time: newest first, or with a prefix search,
+        in order of the searched field.
+        Pages continue from the sort key of the previous page's last user instead
+        of skipping, and each order has an index that provides both the search
+        range and the sort, so every page reads one index range of limit + 1
+        entries however deep it is. Combined filters are applied to that range.
+        """
+        # Support staff can tolerate replication lag, so listings may read from secondaries
+        db = await Database.get_db(settings.USER_LIST_READ_PREFERENCE)
+        limit = min(limit or settings.USER_LIST_DEFAULT_LIMIT, settings.USER_LIST_MAX_LIMIT)
+
+        conditions = []
+        if auth_provider is not None:
+            conditions.append({"auth_provider": auth_provider})
+        if is_verified is not None:
+            conditions.append({"is_verified": is_verified})
+        created_range = {}
+        if created_after is not None:
+            created_range["$gte"] = created_after
+        if created_before is not None:
+            created_range["$lt"] = created_before
+        if created_range:
+            conditions.append({"created_at": created_range})
+        order = "created_at"
+        if search:
+            # Anchored, case-sensitive patterns are the only regexes an index can bound
+            conditions.append({search_field: {"$regex": f"^{re.escape(search)}"}})
+            order = search_field
+        if email:
+            conditions.append({"email": email})
+        query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
+
+        page_query = query
+        if cursor:
+            after = after_position(order, decode_cursor(order, cursor))
+            page_query = {"$and": [query, after]} if query else after
+
+        # One extra document tells whether another page exists
+        users_cursor = db.users.find(page_query, LIST_VIEWS[view]).sort(list(LIST_ORDERS[order].items())).limit(limit + 1)
+        # Case-insensitive exact email matches through the email_ci index
+        options = {"collation": EMAIL_COLLATION} if email else {}
+        if email:
+            users_cursor = users_cursor.collation(EMAIL_COLLATION)
+        users = await users_cursor.to_list(length=limit + 1)
+
+        next_cursor = encode_cursor(order, users[limit - 1]) if len(users) > limit else None
+        users = users[:limit]
+        for user in users:
+            user["_id"] = str(user["_id"])
+
+        page = {"users": users, "next_cursor": next_cursor}
+        if include_total:
+            page.update(await self._count_users(db, query, options))
+        return page
+
+    async def _count_users(self, db, query: dict, options: dict) -> dict:
+        if not query:
+            # Collection metadata, no scan; may drift briefly after an unclean shutdown
+            return {"total": await db.users.estimated_document_count(), "total_is_estimate": True}
+        total = await db.users.count_documents(query, limit=settings.USER_LIST_MAX_COUNT, **options)
+        return {"total": total, "total_is_estimate": total >= settings.USER_LIST_MAX_COUNT}
@@ -0,0 +1,287 @@
+"""
+End-to-end latency and throughput of the auth and user endpoints, driven
+in-process over ASGI through the real app and its lifespan.
+
+Runs against the in-memory database by default, or against a local mongod with
+--mongo-url (only documents created by the run are touched, and they are
+removed afterwards). Google and Apple verification is stubbed, so no request
+leaves the process.
+
+Usage:
+    python -m benchmarks.endpoints --concurrency 1,8,32 --requests 200
+    python -m benchmarks.endpoints --json results.json
+    python -m benchmarks.endpoints --baseline results.json --max-regression 0.15
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import platform
+import sys
+import time
+import uuid
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.harness import asgi_client, install_fake_db, percentile, reset_caches
+
+API = "/api/v1"
+PASSWORD = "Benchmark-password-1"
+
+
+class Scenario:
+    """One endpoint call; build(i) returns the request arguments for the i-th call."""
+
+    def __init__(self, name, method, path, build):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build
+
+
+class Fixture:
+    """Users, tokens and identifiers shared by the scenarios of one run."""
+
+    def __init__(self, run_id: str, users: int):
+        self.run_id = run_id
+        self.users = users
+        self.emails = [f"bench-{run_id}-user{i}@example.com" for i in range(users)]
+        self.access_tokens = []
+        self.refresh_tokens = []
+        self.counter = itertools.count()
+
+    def email(self, kind: str, i: int) -> str:
+        return f"bench-{self.run_id}-{kind}{i}@example.com"
+
+    async def seed(self, db):
+        from bson import ObjectId
+
+        from app.core.auth import AuthHandler
+        from app.core.hashing import get_pwd_context
+
+        # One hash for every seeded user; only login should pay for bcrypt
+        hashed_password = get_pwd_context().hash(PASSWORD)
+        now = datetime.utcnow()
+        for email in self.emails:
+            _id = ObjectId()
+            await db.users.insert_one({
+                "_id": _id,
+                "email": email,
+                "full_name": "Benchmark User",
+                "hashed_password": hashed_password,
+                "auth_provider": "local",
+                "is_active": True,
+                "is_verified": True,
+                "created_at": now,
+                "updated_at": now,
+            })
+            self.access_tokens.append(AuthHandler.create_token({"sub": str(_id)}))
+            self.refresh_tokens.append(AuthHandler.create_token({"sub": str(_id), "refresh": True}))
+
+    async def cleanup(self, db):
+        await db.users.delete_many({"email": {"$regex": f"^bench-{self.run_id}-"}})
+
+    def bearer(self, i: int) -> dict:
+        return {"Authorization": f"Bearer {self.access_tokens[i % self.users]}"}
+
+
+def scenarios(fixture: Fixture):
+    def unique():
+        return next(fixture.counter)
+
+    return [
+        Scenario("register", "POST", "/auth/register", lambda i: {"json": {
+            "email": fixture.email("register", unique()),
+            "full_name": "Benchmark User",
+            "password": PASSWORD,
+        }}),
+        Scenario("login", "POST", "/auth/login", lambda i: {"json": {
+            "email": fixture.emails[i % fixture.users],
+            "password": PASSWORD,
+        }}),
+        Scenario("refresh", "POST", "/auth/refresh", lambda i: {
+            "params": {"refresh_token": fixture.refresh_tokens[i % fixture.users]},
+        }),
+        Scenario("verify", "GET", "/auth/verify", lambda i: {"headers": fixture.bearer(i)}),
+        Scenario("me_get", "GET", "/users/me", lambda i: {"headers": fixture.bearer(i)}),
+        Scenario("me_put", "PUT", "/users/me", lambda i: {
+            "headers": fixture.bearer(i),
+            "json": {"full_name": f"Benchmark User {i}"},
+        }),
+        # Social identities repeat across calls, so runs cover both first sign-in and returning users
+        Scenario("google", "POST", "/auth/google", lambda i: {"json": {"code": f"google{i % fixture.users}"}}),
+        Scenario("apple", "POST", "/auth/apple", lambda i: {"json": {
+            "id_token": f"apple{i % fixture.users}",
+            "full_name": "Benchmark User",
+        }}),
+    ]
+
+
+@contextlib.contextmanager
+def stub_social_auth(fixture: Fixture):
+    """Replace the provider round trips with claims derived from the code or ID token."""
+    from app.services.social_auth import SocialAuth
+
+    async def exchange_google_code(code: str) -> str:
+        return code
+
+    async def verify_token(id_token: str) -> dict:
+        return {"sub": id_token, "email": fixture.email(id_token, 0), "name": "Benchmark User"}
+
+    with mock.patch.object(SocialAuth, "exchange_google_code", staticmethod(exchange_google_code)), \
+            mock.patch.object(SocialAuth, "verify_google_token", staticmethod(verify_token)), \
+            mock.patch.object(SocialAuth, "verify_apple_token", staticmethod(verify_token)):
+        yield
+
+
+@contextlib.asynccontextmanager
+async def running_app(args):
+    """Run the app's own lifespan, connected to the in-memory database unless --mongo-url is set."""
+    from app.core.config import settings
+    from app.db.config import Database
+    from app.main import app
+
+    if args.mongo_url:
+        settings.MONGODB_URL = args.mongo_url
+        async with app.router.lifespan_context(app):
+            yield await Database.get_db()
+        return
+
+    db = install_fake_db(args.rtt_ms / 1000)
+    client = Database.client
+
+    async def connect_db():
+        Database.client = client
+        return True
+
+    with mock.patch.object(Database, "connect_db", staticmethod(connect_db)):
+        async with app.router.lifespan_context(app):
+            yield db
+
+
+async def measure(client, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def call(i):
+        nonlocal errors
+        kwargs = scenario.build(i)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(scenario.method, API + scenario.path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        # Failures are reported in the envelope with a 200, so check both
+        if response.status_code >= 400 or not response.json().get("status"):
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def compare(results, baseline, max_regression: float):
+    """Return a description of every result that is worse than the baseline by more than max_regression."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        for metric in ("p95_ms", "p99_ms"):
+            if result[metric] > before[metric] * (1 + max_regression):
+                regressions.append(f"{label}: {metric} {before[metric]:.2f} -> {result[metric]:.2f}")
+        if result["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(f"{label}: rps {before['rps']:.0f} -> {result['rps']:.0f}")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{label}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def print_result(result: dict):
+    print(
+        f"{result['scenario']:>9} c={result['concurrency']:<4}"
+        f"{result['rps']:9.0f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+        f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}"
+    )
+
+
+async def main(args) -> int:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    fixture = Fixture(uuid.uuid4().hex[:8], args.users)
+    selected = [s for s in scenarios(fixture) if not args.scenarios or s.name in args.scenarios.split(",")]
+    results = []
+
+    with stub_social_auth(fixture):
+        async with running_app(args) as db:
+            await fixture.seed(db)
+            try:
+                async with asgi_client() as client:
+                    for scenario in selected:
+                        if args.warmup:
+                            await measure(client, scenario, args.warmup, max(levels))
+                        for concurrency in levels:
+                            if args.cold:
+                                reset_caches()
+                            result = await measure(client, scenario, args.requests, concurrency)
+                            results.append(result)
+                            print_result(result)
+            finally:
+                if args.mongo_url:
+                    await fixture.cleanup(db)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "database": "mongod" if args.mongo_url else f"in-memory ({args.rtt_ms} ms rtt)",
+            "requests": args.requests,
+            "users": args.users,
+            "cold": args.cold,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.max_regression:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--scenarios", default="", help="comma-separated subset, e.g. login,verify")
+    parser.add_argument("--cold", action="store_true", help="clear the token and user caches before each level")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Mongo round trip")
+    parser.add_argument("--mongo-url", help="benchmark against this mongod instead of the in-memory database")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results previously written with --json")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed relative slowdown before a result counts as a regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
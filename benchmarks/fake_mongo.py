@@ -0,0 +1,288 @@
+"""
+In-memory stand-in for the parts of Motor the services use.
+
+Every operation awaits a configurable round-trip delay so benchmarks see the
+cost of each query the way they would against a real mongod, without one.
+"""
+import asyncio
+import copy
+import re
+from collections import defaultdict
+
+from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, InsertOneResult, UpdateResult
+
+
+def _get(document, path):
+    for part in path.split("."):
+        if not isinstance(document, dict) or part not in document:
+            return None
+        document = document[part]
+    return document
+
+
+def _matches_condition(value, condition):
+    if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+        for op, operand in condition.items():
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+            if op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not isinstance(value, str) or not re.search(operand, value, flags):
+                    return False
+            if op == "$exists" and (value is not None) != operand:
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    return value == condition
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif not _matches_condition(_get(document, key), condition):
+            return False
+    return True
+
+
+def project(document, projection):
+    if document is None or not projection:
+        return copy.deepcopy(document)
+    include = {key for key, value in projection.items() if value and key != "_id"}
+    if include:
+        result = {key: copy.deepcopy(document[key]) for key in include if key in document}
+        if projection.get("_id", 1):
+            result["_id"] = document["_id"]
+        return result
+    return {key: copy.deepcopy(value) for key, value in document.items() if projection.get(key, 1)}
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, _):
+        return self
+
+    def collation(self, _):
+        # Exact matches only; case-insensitive comparison is not emulated
+        return self
+
+    async def _load(self):
+        await self._collection.round_trip()
+        documents = [d for d in self._collection.documents.values() if matches(d, self._query)]
+        for key, direction in reversed(self._sort):
+            documents.sort(key=lambda d: (_get(d, key) is not None, _get(d, key)), reverse=direction == -1)
+        if self._limit:
+            documents = documents[:self._limit]
+        self._results = [project(d, self._projection) for d in documents]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._results is None:
+            await self._load()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+    async def to_list(self, length=None):
+        if self._results is None:
+            await self._load()
+        results, self._results = self._results, []
+        return results
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.documents = {}
+        self.unique_fields = {"email"} if name == "users" else set()
+
+    async def round_trip(self):
+        self.database.operations[self.name] += 1
+        if self.database.latency:
+            await asyncio.sleep(self.database.latency)
+
+    def _check_unique(self, document, ignore_id=None):
+        for field in self.unique_fields:
+            value = document.get(field)
+            if value is None:
+                continue
+            for other in self.documents.values():
+                if other["_id"] != ignore_id and other.get(field) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key error: {field}", code=11000)
+
+    def _insert(self, document):
+        document.setdefault("_id", ObjectId())
+        self._check_unique(document)
+        self.documents[document["_id"]] = copy.deepcopy(document)
+        return document["_id"]
+
+    def _apply_update(self, document, update, inserting=False):
+        updated = copy.deepcopy(document)
+        for key, value in update.get("$set", {}).items():
+            updated[key] = copy.deepcopy(value)
+        if inserting:
+            for key, value in update.get("$setOnInsert", {}).items():
+                updated[key] = copy.deepcopy(value)
+        for key in update.get("$unset", {}):
+            updated.pop(key, None)
+        for key, value in update.get("$inc", {}).items():
+            updated[key] = updated.get(key, 0) + value
+        self._check_unique(updated, ignore_id=updated.get("_id"))
+        return updated
+
+    def _upsert_base(self, query):
+        return {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+
+    def _first(self, query):
+        for document in self.documents.values():
+            if matches(document, query):
+                return document
+        return None
+
+    async def find_one(self, query=None, projection=None, **_):
+        await self.round_trip()
+        return project(self._first(query or {}), projection)
+
+    def find(self, query=None, projection=None, **_):
+        return FakeCursor(self, query or {}, projection)
+
+    async def insert_one(self, document, **_):
+        await self.round_trip()
+        return InsertOneResult(self._insert(document), True)
+
+    async def update_one(self, query, update, upsert=False, **_):
+        await self.round_trip()
+        document = self._first(query)
+        if document is None:
+            if not upsert:
+                return UpdateResult({"n": 0, "nModified": 0}, True)
+            inserted = self._apply_update(self._upsert_base(query), update, inserting=True)
+            _id = self._insert(inserted)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": _id}, True)
+        self.documents[document["_id"]] = self._apply_update(document, update)
+        return UpdateResult({"n": 1, "nModified": 1}, True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **_):
+        await self.round_trip()
+        document = self._first(query)
+        if document is None:
+            if not upsert:
+                return None
+            inserted = self._apply_update(self._upsert_base(query), update, inserting=True)
+            self._insert(inserted)
+            return project(inserted, projection) if return_document == ReturnDocument.AFTER else None
+        updated = self._apply_update(document, update)
+        self.documents[document["_id"]] = updated
+        return project(updated if return_document == ReturnDocument.AFTER else document, projection)
+
+    async def bulk_write(self, requests, ordered=True, **_):
+        await self.round_trip()
+        inserted = matched = 0
+        write_errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    inserted += 1
+                elif isinstance(request, UpdateOne):
+                    document = self._first(request._filter)
+                    if document is not None:
+                        self.documents[document["_id"]] = self._apply_update(document, request._doc)
+                        matched += 1
+            except DuplicateKeyError as e:
+                write_errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        details = {"nInserted": inserted, "nMatched": matched, "nModified": matched}
+        if write_errors:
+            raise BulkWriteError({**details, "writeErrors": write_errors})
+        return BulkWriteResult(details, True)
+
+    async def estimated_document_count(self, **_):
+        await self.round_trip()
+        return len(self.documents)
+
+    async def count_documents(self, query, **_):
+        await self.round_trip()
+        return sum(1 for d in self.documents.values() if matches(d, query))
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.operations = defaultdict(int)
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def with_options(self, **_):
+        # Read preferences only matter with replicas
+        return self
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+
+class FakeClient:
+    """Stands in for AsyncIOMotorClient; every database name maps to the same FakeDatabase."""
+
+    def __init__(self, latency: float = 0.0):
+        self.database = FakeDatabase(latency)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.database
+
+    def __getitem__(self, name):
+        return self.database
+
+    def close(self):
+        pass
@@ -0,0 +1,52 @@
+"""Shared setup for benchmarks that drive the real app in-process."""
+import logging
+import math
+import os
+
+# Settings the app refuses to start without; real values are never needed offline
+for name, value in {
+    "JWT_SECRET_KEY": "benchmark-secret",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "GOOGLE_CLIENT_ID": "benchmark-client-id",
+    "GOOGLE_CLIENT_SECRET": "benchmark-client-secret",
+    "BUNDLE_ID_IOS": "com.example.benchmark",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+
+from benchmarks.fake_mongo import FakeClient, FakeDatabase
+
+# Per-request client logging would dominate the measurements
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def install_fake_db(latency: float = 0.0) -> FakeDatabase:
+    """Point Database at an in-memory stand-in with the given per-operation latency."""
+    from app.db.config import Database
+
+    client = FakeClient(latency)
+    Database.client = client
+    return client.database
+
+
+def reset_caches():
+    from app.core.auth import token_cache
+    from app.core.user_cache import user_cache
+
+    token_cache.clear()
+    user_cache._local.clear()
+
+
+def asgi_client() -> httpx.AsyncClient:
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
@@ -0,0 +1,99 @@
+"""
+Time `import app.main` in fresh interpreters and check that the dependencies
+deferred to first use are not imported eagerly again.
+
+Usage:
+    python -m benchmarks.import_time --runs 5 --top 15
+    python -m benchmarks.import_time --max-ms 900 --json import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import benchmarks.harness  # noqa: F401  (provides the settings the app needs)
+
+# Only needed by specific requests or optional features, so never at import
+DEFERRED_MODULES = (
+    "apscheduler",
+    "httpx",
+    "jose.jwt",
+    "motor.motor_asyncio",
+    "passlib.context",
+    "redis",
+    "uvicorn",
+)
+
+TIMED_IMPORT = (
+    "import time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started)"
+)
+LOADED_MODULES = "import json, sys; import app.main; print(json.dumps(sorted(sys.modules)))"
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+
+def import_profile(top: int):
+    """Modules with the largest cumulative import time, from -X importtime."""
+    rows = []
+    for line in run("import app.main", "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main(args) -> int:
+    # The first run warms the filesystem and bytecode caches and is discarded
+    run(TIMED_IMPORT)
+    samples = [float(run(TIMED_IMPORT).stdout.strip()) * 1000 for _ in range(args.runs)]
+    loaded = set(json.loads(run(LOADED_MODULES).stdout))
+    eager = [module for module in DEFERRED_MODULES if module in loaded]
+    profile = import_profile(args.top)
+
+    print(f"import app.main: median {statistics.median(samples):.1f} ms, "
+          f"min {min(samples):.1f} ms, max {max(samples):.1f} ms over {args.runs} runs")
+    print(f"{len(loaded)} modules loaded")
+    for row in profile:
+        print(f"{row['cumulative_ms']:9.1f} ms  {row['module']}")
+
+    report = {
+        "median_ms": statistics.median(samples),
+        "samples_ms": samples,
+        "modules_loaded": len(loaded),
+        "eager_deferred_modules": eager,
+        "profile": profile,
+    }
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+
+    failed = False
+    if eager:
+        print(f"REGRESSION modules that should load on first use were imported eagerly: {', '.join(eager)}")
+        failed = True
+    if args.max_ms and report["median_ms"] > args.max_ms:
+        print(f"REGRESSION median import time {report['median_ms']:.1f} ms exceeds {args.max_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--max-ms", type=float, help="fail when the median import time exceeds this")
+    parser.add_argument("--json", help="write the results to this file")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Compare token validation throughput of one /auth/verify call per token against
+/auth/introspect/batch, both driven in-process against the in-memory database.
+
+Usage:
+    python -m benchmarks.introspection --tokens 2000 --batch-size 100 --rtt-ms 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.harness import asgi_client, install_fake_db, reset_caches
+
+API = "/api/v1/auth"
+API_KEY = "benchmark-introspection-key"
+
+
+async def seed(db, users: int, tokens: int):
+    from datetime import datetime
+
+    from bson import ObjectId
+
+    from app.core.auth import AuthHandler
+
+    now = datetime.utcnow()
+    ids = []
+    for i in range(users):
+        _id = ObjectId()
+        db.users.documents[_id] = {
+            "_id": _id,
+            "email": f"user{i}@example.com",
+            "full_name": f"User {i}",
+            "auth_provider": "local",
+            "is_active": True,
+            "is_verified": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        ids.append(str(_id))
+    return [AuthHandler.create_token({"sub": ids[i % users]}) for i in range(tokens)]
+
+
+async def run_single(client, tokens, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(token):
+        async with semaphore:
+            response = await client.get(f"{API}/verify", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+
+    await asyncio.gather(*(verify(token) for token in tokens))
+
+
+async def run_batch(client, tokens, batch_size, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def introspect(batch):
+        async with semaphore:
+            response = await client.post(
+                f"{API}/introspect/batch",
+                json={"tokens": batch},
+                headers={"X-API-Key": API_KEY}
+            )
+            assert response.json()["status"]
+
+    batches = [tokens[i:i + batch_size] for i in range(0, len(tokens), batch_size)]
+    await asyncio.gather(*(introspect(batch) for batch in batches))
+
+
+async def main(args):
+    from app.core.config import settings
+
+    settings.INTROSPECTION_API_KEY = API_KEY
+    db = install_fake_db(args.rtt_ms / 1000)
+    tokens = await seed(db, args.users, args.tokens)
+
+    async with asgi_client() as client:
+        for name, run in (
+            ("single", lambda: run_single(client, tokens, args.concurrency)),
+            ("batch", lambda: run_batch(client, tokens, args.batch_size, args.concurrency)),
+        ):
+            reset_caches()
+            db.operations.clear()
+            started = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - started
+            print(
+                f"{name:>6}: {len(tokens) / elapsed:10.0f} tokens/s  "
+                f"{elapsed * 1000:8.1f} ms  mongo ops {sum(db.operations.values())}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Mongo round trip")
+    asyncio.run(main(parser.parse_args()))
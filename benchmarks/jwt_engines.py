@@ -0,0 +1,62 @@
+"""
+Micro-benchmark of token encode/decode throughput for each token engine.
+
+Usage:
+    python -m benchmarks.jwt_engines --seconds 1
+"""
+import argparse
+import time
+
+import benchmarks.harness  # noqa: F401  (provides the settings the app needs)
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from app.core.keys import KeyRing
+from app.core.tokens import HS256Engine, JoseEngine
+
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def engines():
+    secret = "benchmark-secret"
+    yield "hs256 (fast path)", HS256Engine(secret)
+    yield "jose HS256", JoseEngine(KeyRing("HS256", secret=secret))
+    yield "jose RS256", JoseEngine(KeyRing(
+        "RS256", signing_keys={"rsa": _pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))}
+    ))
+    yield "jose ES256", JoseEngine(KeyRing(
+        "ES256", signing_keys={"ec": _pem(ec.generate_private_key(ec.SECP256R1()))}
+    ))
+
+
+def ops_per_second(func, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return count / (time.perf_counter() - started)
+
+
+def main(seconds: float):
+    claims = {"sub": "64b7f0c2e4b0a1a2b3c4d5e6", "exp": int(time.time()) + 3600}
+    print(f"{'engine':<20}{'encode/s':>12}{'decode/s':>12}")
+    for name, engine in engines():
+        token = engine.encode(claims)
+        encode = ops_per_second(lambda: engine.encode(claims), seconds)
+        decode = ops_per_second(lambda: engine.decode(token), seconds)
+        print(f"{name:<20}{encode:>12.0f}{decode:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per measurement")
+    main(parser.parse_args().seconds)
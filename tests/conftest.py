@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+# Settings the app refuses to start without; real values are never needed in tests
+for name, value in {
+    "JWT_SECRET_KEY": "test-secret",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "GOOGLE_CLIENT_ID": "test-client-id",
+    "GOOGLE_CLIENT_SECRET": "test-client-secret",
+    "BUNDLE_ID_IOS": "com.example.test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def fake_db():
+    """The benchmarks' in-memory database in place of MongoDB, for the duration of a test."""
+    from app.db.config import Database
+    from benchmarks.harness import install_fake_db
+
+    previous = Database.client, Database._routed
+    Database._routed = {}
+    try:
+        yield install_fake_db()
+    finally:
+        Database.client, Database._routed = previous
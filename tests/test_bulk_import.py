@@ -0,0 +1,116 @@
+"""
+Parsing of bulk import streams: every record becomes a row or a row error,
+and a bad record never stops the ones after it.
+"""
+import asyncio
+import codecs
+from typing import List
+
+from app.services.bulk_user_service import iter_lines, iter_rows
+
+MAX_LINE_BYTES = 64
+
+
+async def _chunks(chunks: List[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+def parse(chunks: List[bytes], fmt: str, max_line_bytes: int = MAX_LINE_BYTES) -> list:
+    async def collect():
+        lines = iter_lines(_chunks(chunks), max_line_bytes)
+        return [row async for row in iter_rows(lines, fmt, max_line_bytes)]
+
+    return asyncio.run(collect())
+
+
+def split(chunks: List[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> list:
+    async def collect():
+        return [line async for line in iter_lines(_chunks(chunks), max_line_bytes)]
+
+    return asyncio.run(collect())
+
+
+def test_lines_split_across_chunks():
+    assert split([b"ab", b"c\nde", b"f\n", b"g"]) == [b"abc", b"def", b"g"]
+
+
+def test_oversized_line_is_yielded_as_none():
+    long_line = b"x" * (MAX_LINE_BYTES + 1)
+    # Delivered in pieces, so the line is dropped while it arrives rather than buffered
+    assert split([b"a\n", long_line[:40], long_line[40:], b"\nb\n"]) == [b"a", None, b"b"]
+    assert split([b"a\n", long_line]) == [b"a", None]
+
+
+def test_oversized_line_is_reported_and_the_import_continues():
+    rows = parse([b'{"email": "a@example.com"}\n', b"x" * 100, b'\n{"email": "b@example.com"}\n'], "ndjson")
+    assert rows == [
+        (1, {"email": "a@example.com"}, None),
+        (2, None, f"Line exceeds {MAX_LINE_BYTES} bytes"),
+        (3, {"email": "b@example.com"}, None),
+    ]
+
+
+def test_utf8_bom_is_stripped():
+    rows = parse([codecs.BOM_UTF8 + b"email,full_name\na@example.com,A\n"], "csv")
+    assert rows == [(1, {"email": "a@example.com", "full_name": "A"}, None)]
+
+    rows = parse([codecs.BOM_UTF8 + b'{"email": "a@example.com"}\n'], "ndjson")
+    assert rows == [(1, {"email": "a@example.com"}, None)]
+
+
+def test_invalid_utf8_row_is_reported_and_the_import_continues():
+    rows = parse([b"email,full_name\n", b"a@example.com,\xff\n", b"b@example.com,B\r\n"], "csv")
+    assert rows[0][:2] == (1, None)
+    assert rows[0][2].startswith("Invalid UTF-8")
+    assert rows[1] == (2, {"email": "b@example.com", "full_name": "B"}, None)
+
+    rows = parse([b'{"email": "\xff"}\n{"email": "b@example.com"}\n'], "ndjson")
+    assert rows[0][2].startswith("Invalid UTF-8")
+    assert rows[1] == (2, {"email": "b@example.com"}, None)
+
+
+def test_quoted_csv_field_may_span_lines():
+    rows = parse([b'email,full_name\na@example.com,"Ada\nLovelace"\nb@example.com,B\n'], "csv")
+    assert rows == [
+        (1, {"email": "a@example.com", "full_name": "Ada\nLovelace"}, None),
+        (2, {"email": "b@example.com", "full_name": "B"}, None),
+    ]
+
+
+def test_unterminated_quote_is_reported():
+    rows = parse([b'email,full_name\na@example.com,"Ada\n'], "csv")
+    assert rows == [(1, None, "Unterminated quoted field")]
+
+    # A record that never closes is cut off at the size limit instead of swallowing the file
+    rows = parse([b'email,full_name\na@example.com,"Ada\n'] + [b"more text\n"] * 10, "csv")
+    assert rows[0][:2] == (1, None)
+    assert rows[0][2].startswith(f"Record exceeds {MAX_LINE_BYTES} bytes")
+
+
+def test_csv_column_count_mismatch_is_reported():
+    rows = parse([b"email,full_name\na@example.com\nb@example.com,B,extra\nc@example.com,C\n"], "csv")
+    assert rows == [
+        (1, None, "Expected 2 columns, got 1"),
+        (2, None, "Expected 2 columns, got 3"),
+        (3, {"email": "c@example.com", "full_name": "C"}, None),
+    ]
+
+
+def test_empty_csv_cells_are_omitted():
+    rows = parse([b"email,full_name,phone_number\na@example.com,,\n"], "csv")
+    assert rows == [(1, {"email": "a@example.com"}, None)]
+
+
+def test_invalid_header_stops_the_import():
+    rows = parse([b"email,\xff\na@example.com,A\n"], "csv")
+    assert len(rows) == 1
+    assert rows[0][:2] == (0, None)
+    assert rows[0][2].startswith("Invalid header: Invalid UTF-8")
+
+
+def test_ndjson_rows_must_be_objects():
+    rows = parse([b'[1, 2]\n{not json}\n\n{"email": "a@example.com"}\n'], "ndjson")
+    assert rows[0] == (1, None, "Each line must be a JSON object")
+    assert rows[1][2].startswith("Invalid JSON")
+    assert rows[2] == (3, {"email": "a@example.com"}, None)
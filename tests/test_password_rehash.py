@@ -0,0 +1,65 @@
+"""
+Rehash on login: hashes made under an older policy are replaced after a
+successful login, but never over a password that changed meanwhile.
+"""
+import asyncio
+
+import pytest
+
+from app.core import hashing
+from app.core.auth import AuthHandler
+from app.core.config import settings
+from app.services.auth_service import AuthService
+
+EMAIL = "rehash@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    """The current policy costs 5 bcrypt rounds; stored hashes were made with 4."""
+    current = hashing.build_context("bcrypt", rounds=5)
+    monkeypatch.setattr(hashing, "get_pwd_context", lambda: current)
+    monkeypatch.setattr(settings, "PASSWORD_REHASH_ON_LOGIN", True)
+    monkeypatch.setattr(settings, "LOGIN_STAMP_WRITE_BEHIND", False)
+    return current
+
+
+async def _insert_user(fake_db) -> str:
+    old_hash = hashing.build_context("bcrypt", rounds=4).hash(PASSWORD)
+    await fake_db.users.insert_one({"email": EMAIL, "hashed_password": old_hash, "auth_provider": "local"})
+    return old_hash
+
+
+def test_outdated_hash_is_replaced_on_login(fake_db, policy):
+    async def scenario():
+        old_hash = await _insert_user(fake_db)
+        await AuthService().login_user(EMAIL, PASSWORD)
+        return old_hash, await fake_db.users.find_one({"email": EMAIL})
+
+    old_hash, user = asyncio.run(scenario())
+    assert user["hashed_password"] != old_hash
+    assert user["hashed_password"].startswith("$2b$05$")
+    assert policy.verify(PASSWORD, user["hashed_password"])
+    assert not policy.needs_update(user["hashed_password"])
+
+
+def test_rehash_does_not_overwrite_a_concurrent_password_change(fake_db, policy, monkeypatch):
+    changed_hash = policy.hash("a newer password")
+    verify = AuthHandler.verify_and_update_password_async
+
+    async def verify_while_password_changes(plain_password, hashed_password):
+        result = await verify(plain_password, hashed_password)
+        # The user changes their password after login read the old hash
+        await fake_db.users.update_one({"email": EMAIL}, {"$set": {"hashed_password": changed_hash}})
+        return result
+
+    monkeypatch.setattr(AuthHandler, "verify_and_update_password_async", verify_while_password_changes)
+
+    async def scenario():
+        await _insert_user(fake_db)
+        await AuthService().login_user(EMAIL, PASSWORD)
+        return await fake_db.users.find_one({"email": EMAIL})
+
+    user = asyncio.run(scenario())
+    assert user["hashed_password"] == changed_hash
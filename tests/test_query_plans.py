@@ -0,0 +1,39 @@
+"""
+Every registered query shape must be served by an index.
+
+Runs against the mongod at MONGODB_TEST_URL in a throwaway database; skipped
+when it is not set.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from app.db.indexes import INDEXES, ensure_indexes, verify_query_plans
+
+MONGODB_TEST_URL = os.environ.get("MONGODB_TEST_URL")
+
+pytestmark = pytest.mark.skipif(not MONGODB_TEST_URL, reason="MONGODB_TEST_URL is not set")
+
+
+def test_no_query_shape_needs_a_collscan():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def scenario():
+        client = AsyncIOMotorClient(MONGODB_TEST_URL, serverSelectionTimeoutMS=5000)
+        name = f"test_query_plans_{uuid.uuid4().hex}"
+        try:
+            db = client[name]
+            await ensure_indexes(db)
+            # A second run must find nothing left to do
+            await ensure_indexes(db)
+            assert await verify_query_plans(db) == []
+            for collection, models in INDEXES.items():
+                existing = await db[collection].index_information()
+                assert {model.document["name"] for model in models} <= set(existing)
+        finally:
+            await client.drop_database(name)
+            client.close()
+
+    asyncio.run(scenario())
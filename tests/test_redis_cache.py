@@ -0,0 +1,134 @@
+"""
+Shared user cache invalidation across nodes.
+
+Runs against the redis-server at REDIS_TEST_URL when it is set, otherwise
+against fakeredis; skipped when neither is available.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from app.core.redis_cache import RedisCache
+from app.core.user_cache import UserCache
+
+
+@pytest.fixture
+def fake_server():
+    """The fakeredis server shared by every node, or None with a real redis-server."""
+    if os.environ.get("REDIS_TEST_URL"):
+        return None
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(fake_server):
+    def connect():
+        if fake_server is None:
+            from redis import asyncio as aioredis
+
+            return aioredis.Redis.from_url(os.environ["REDIS_TEST_URL"])
+        import fakeredis
+
+        return fakeredis.FakeAsyncRedis(server=fake_server)
+
+    return connect
+
+
+@pytest.fixture
+def node(redis_client):
+    namespace = f"test-{uuid.uuid4().hex}"
+
+    def make() -> UserCache:
+        shared = RedisCache(namespace=namespace, ttl=60, client=redis_client(), retry_interval=0.05)
+        return UserCache(max_size=100, ttl=60, negative_ttl=10, shared=shared)
+
+    return make
+
+
+async def _eventually(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_invalidation_evicts_other_nodes(node):
+    async def scenario():
+        first, second = node(), node()
+        await first.start()
+        await second.start()
+        try:
+            await first.set("user-1", {"email": "a@example.com"})
+            assert await second.get("user-1") == {"email": "a@example.com"}
+            await asyncio.sleep(0.1)  # both subscriptions are live
+
+            await first.invalidate("user-1")
+            await _eventually(lambda: second._local.get("user-1") is None)
+            assert await first.shared.get("user-1") is None
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_delete_during_outage_is_retried(fake_server, node):
+    if fake_server is None:
+        pytest.skip("needs fakeredis to simulate an outage")
+
+    async def scenario():
+        cache = node()
+        await cache.shared.set("user-1", {"email": "a@example.com"})
+
+        fake_server.connected = False
+        await cache.invalidate("user-1")
+        assert cache.shared.stats()["pending_deletes"] == 1
+        assert not cache.shared.available
+
+        fake_server.connected = True
+        await cache.start()
+        try:
+            await _eventually(lambda: cache.shared.stats()["pending_deletes"] == 0)
+            assert await cache.shared.client.get(cache.shared._key("user-1")) is None
+        finally:
+            await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_delete_while_down_does_not_wait_on_redis(node):
+    async def scenario():
+        cache = node()
+        cache.shared._mark_down(ConnectionError("down"))
+
+        def unreachable(*args, **kwargs):
+            raise AssertionError("Redis was called while marked down")
+
+        cache.shared._client.pipeline = unreachable
+        await cache.invalidate("user-1")
+        assert cache.shared.stats()["pending_deletes"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_clears_local_copies(fake_server, node):
+    if fake_server is None:
+        pytest.skip("needs fakeredis to simulate an outage")
+
+    async def scenario():
+        cache = node()
+        await cache.start()
+        try:
+            cache._set_local("user-1", {"email": "a@example.com"})
+            fake_server.connected = False
+            await _eventually(lambda: not cache.shared.available)
+            fake_server.connected = True
+            # Invalidations published while disconnected were missed, so L1 starts over
+            await _eventually(lambda: cache._local.get("user-1") is None)
+        finally:
+            await cache.close()
+
+    asyncio.run(scenario())
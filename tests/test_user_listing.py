@@ -0,0 +1,134 @@
+"""
+Keyset pagination of the admin user listing: cursors, the filters they
+produce, and paging through every order on the in-memory database.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.db.indexes import LIST_ORDERS
+from app.services.user_service import UserService, after_position, decode_cursor, encode_cursor
+
+# BSON keeps milliseconds, as MongoDB stores them
+CREATED_AT = datetime(2024, 1, 1, 12, 0, 0, 123000)
+
+
+def _user(i: int, **fields) -> dict:
+    user = {
+        "_id": ObjectId(),
+        "email": f"user{i:02d}@example.com",
+        "full_name": f"Name {i % 4}",  # repeated, so the _id tie-breaker matters
+        "auth_provider": "local",
+        "is_active": True,
+        "is_verified": False,
+        # Pairs of users share a creation time
+        "created_at": CREATED_AT + timedelta(seconds=i // 2),
+    }
+    user.update(fields)
+    return user
+
+
+@pytest.mark.parametrize("order", list(LIST_ORDERS))
+def test_cursor_round_trips(order):
+    user = _user(7)
+    values = decode_cursor(order, encode_cursor(order, user))
+    assert values == [user[field] for field in LIST_ORDERS[order]]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "bm90IGJzb24=",  # valid base64, not BSON
+    encode_cursor("email", _user(1)),  # another order's cursor
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor("created_at", cursor)
+    assert raised.value.status_code == 400
+
+
+def test_after_position_descending_created_at():
+    user_id = ObjectId()
+    assert after_position("created_at", [CREATED_AT, user_id]) == {"$or": [
+        {"created_at": {"$lt": CREATED_AT}},
+        {"created_at": CREATED_AT, "_id": {"$lt": user_id}},
+    ]}
+
+
+def test_after_position_ascending_full_name():
+    user_id = ObjectId()
+    assert after_position("full_name", ["Ada", user_id]) == {"$or": [
+        {"full_name": {"$gt": "Ada"}},
+        {"full_name": "Ada", "_id": {"$gt": user_id}},
+    ]}
+
+
+def test_after_position_unique_email():
+    assert after_position("email", ["a@example.com"]) == {"email": {"$gt": "a@example.com"}}
+
+
+def _expected(users: list, order: str) -> list:
+    ordered = list(users)
+    for field, direction in reversed(list(LIST_ORDERS[order].items())):
+        ordered.sort(key=lambda user: user[field], reverse=direction == -1)
+    return [str(user["_id"]) for user in ordered]
+
+
+@pytest.mark.parametrize("order, search", [
+    ("created_at", None),
+    ("email", "user"),
+    ("full_name", "Name"),
+])
+def test_paging_visits_every_user_once(fake_db, order, search):
+    users = [_user(i) for i in range(23)]
+
+    async def scenario():
+        for user in users:
+            await fake_db.users.insert_one(user)
+        service = UserService()
+        seen, cursor, pages = [], None, 0
+        # Bounded, so a cursor that never advances fails instead of looping forever
+        while pages < 10:
+            page = await service.list_users(
+                search=search,
+                search_field=order if search else "email",
+                cursor=cursor,
+                limit=5
+            )
+            seen.extend(user["_id"] for user in page["users"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        return seen, pages
+
+    seen, pages = asyncio.run(scenario())
+    assert seen == _expected(users, order)
+    assert pages == 5
+
+
+def test_bad_cursor_returns_400(fake_db, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "admin-key")
+    path = next(route.path for route in app.routes if route.path.endswith("/users"))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"X-API-Key": "admin-key"}
+            malformed = await client.get(path, params={"cursor": "not a cursor"}, headers=headers)
+            cross_order = await client.get(
+                path,
+                params={"cursor": encode_cursor("created_at", _user(1)), "search": "user"},
+                headers=headers
+            )
+            return malformed, cross_order
+
+    for response in asyncio.run(scenario()):
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"